@@ -1,9 +1,15 @@
-from typing import Dict, Any, Optional, List, TypedDict, Callable
+from typing import Dict, Any, Optional, List, Tuple, TypedDict, Callable, AsyncIterator, Annotated, Union
 from langgraph.graph import StateGraph, END, START
+from langgraph.types import Send
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_openai import ChatOpenAI
-from datetime import datetime
 import asyncio
+import httpx
+import logging
+import hashlib
+import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import re
 
 try:
@@ -11,14 +17,208 @@ try:
 except ImportError:
     from langchain_community.llms import Ollama as OllamaLLM
 
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+    print("Biblioteca tiktoken não encontrada. Para truncamento por tokens, instale com: pip install tiktoken")
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+    print("Biblioteca h2 não encontrada. Para HTTP/2 nas chamadas à OpenAI, instale com: pip install httpx[http2]")
+
 # Importações das funções de busca
 from search.google_search import execute_google_search, extract_web_content
 from search.arxiv_search import execute_arxiv_search
 from search.wikipedia_search import execute_wikipedia_search
+from search.cache import TTLCache, canonical_url, normalize_query
+from search.http_client import RateLimiter
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Número máximo de páginas extraídas simultaneamente por pesquisa
+MAX_CONCURRENT_EXTRACTIONS = 10
+
+# Requisições por segundo a um mesmo host durante a extração (evita bloqueios e erros 429)
+PER_HOST_RATE = 5
+
+# Tempo máximo (segundos) de extração de uma página, do download ao parsing.
+# O timeout do requests vale por leitura, então um servidor lento pode ultrapassá-lo
+EXTRACTION_TIMEOUT = 20
+
+# Threads dedicadas aos downloads de páginas, separadas do executor padrão do asyncio
+# (usado pelas buscas): extrações lentas ou abandonadas por timeout não atrasam as buscas.
+# A folga acima de MAX_CONCURRENT_EXTRACTIONS cobre threads ainda presas após um timeout
+EXTRACTION_WORKERS = MAX_CONCURRENT_EXTRACTIONS * 2
+EXTRACTION_EXECUTOR = ThreadPoolExecutor(max_workers=EXTRACTION_WORKERS, thread_name_prefix="extraction")
+
+# Marcador usado pelo LLM para indicar que a pesquisa já pode ser encerrada
+ENOUGH_INFO_RE = re.compile(r"informações suficientes", re.IGNORECASE)
+
+# Número máximo de chamadas simultâneas ao LLM (respeita limites de taxa do provedor)
+MAX_CONCURRENT_LLM_CALLS = 5
+
+# Orçamento de conteúdo de cada site enviado ao LLM para resumo
+# (em tokens quando o tokenizer do modelo está disponível, senão em caracteres)
+SUMMARY_INPUT_MAX_TOKENS = 2000
+SUMMARY_INPUT_MAX_CHARS = 8000
+
+# Tokenizer usado como aproximação para modelos sem mapeamento no tiktoken (ex.: Ollama)
+FALLBACK_ENCODING = "cl100k_base"
+
+# Pool de conexões do cliente HTTP compartilhado pelas instâncias de ChatOpenAI
+OPENAI_HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+_openai_http_client: Optional[httpx.AsyncClient] = None
+
+def get_openai_http_client() -> httpx.AsyncClient:
+    """
+    Cliente HTTP assíncrono único do processo para a API da OpenAI. Cada pesquisa cria
+    um agente novo; com o cliente compartilhado, as conexões TLS (e HTTP/2) abertas por
+    uma pesquisa são reaproveitadas pelas seguintes.
+    """
+    global _openai_http_client
+    if _openai_http_client is None or _openai_http_client.is_closed:
+        _openai_http_client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=OPENAI_HTTP_LIMITS)
+    return _openai_http_client
+
+# Respostas do LLM reaproveitadas para prompts idênticos (provedor + modelo + prompt)
+LLM_CACHE = TTLCache(maxsize=256, ttl=3600)
+
+# Instruções de resumo por tipo de fonte. Ficam no início da mensagem (system prompt
+# em modelos de chat) e são idênticas entre chamadas, o que permite ao provedor
+# reaproveitar o prefixo em cache; o conteúdo de cada site vem depois
+SUMMARY_INSTRUCTIONS_ARXIV = """Você vai analisar o conteúdo extraído de um artigo científico do arXiv, enviado ao final.
+
+Crie um resumo estruturado seguindo estas diretrizes:
+
+1. **Identifique os principais tópicos acadêmicos** abordados no artigo.
+2. **Para cada tópico**, forneça um título claro e uma descrição técnica concisa.
+3. **Crie um resumo científico** do conteúdo completo, com 400 a 1000 palavras.
+4. **Extraia quaisquer resultados, métodos ou conclusões importantes** encontrados no artigo.
+5. **Destaque a relevância acadêmica** deste artigo para o tema da pesquisa.
+
+Formato esperado:
+
+## Tópicos Principais
+
+### [Tópico 1]
+[Descrição técnica]
+
+### [Tópico 2]
+[Descrição técnica]
+
+...
+
+## Resumo Científico (300-600 palavras)
+
+[Seu resumo aqui]
+
+## Dados e Resultados Relevantes
+
+- [Resultado/método 1]
+- [Resultado/método 2]
+..."""
+
+SUMMARY_INSTRUCTIONS_WIKIPEDIA = """Você vai analisar o conteúdo extraído de um artigo da Wikipedia, enviado ao final.
+
+Crie um resumo estruturado seguindo estas diretrizes:
+
+1. **Identifique de 3 a 5 tópicos principais** abordados no artigo.
+2. **Para cada tópico**, forneça um título claro e um resumo informativo.
+3. **Crie um resumo enciclopédico** do conteúdo completo, com 300 a 600 palavras.
+4. **Extraia fatos, datas, definições e informações contextuais** importantes.
+5. **Destaque as conexões com outros tópicos relevantes** mencionados no artigo.
+
+Formato esperado:
+
+## Tópicos Principais
+
+### [Tópico 1]
+[Resumo informativo]
+
+### [Tópico 2]
+[Resumo informativo]
+
+...
+
+## Resumo Enciclopédico (300-600 palavras)
+
+[Seu resumo aqui]
+
+## Fatos e Informações Importantes
+
+- [Fato/definição 1]
+- [Fato/definição 2]
+..."""
+
+SUMMARY_INSTRUCTIONS_SITE = """Você vai analisar o conteúdo extraído de um site, enviado ao final.
+
+Crie um resumo estruturado seguindo estas diretrizes:
+
+1. **Identifique de 3 a 5 tópicos principais** abordados no conteúdo.
+2. **Para cada tópico**, forneça um título claro e uma breve descrição.
+3. **Crie um resumo abrangente** do conteúdo completo, com 300 a 600 palavras.
+4. **Extraia quaisquer fatos, estatísticas ou dados relevantes** encontrados no conteúdo.
+
+Formato esperado:
+
+## Tópicos Principais
+
+### [Tópico 1]
+[Breve descrição]
+
+### [Tópico 2]
+[Breve descrição]
+
+...
+
+## Resumo Geral (300-600 palavras)
+
+[Seu resumo completo aqui]
+
+## Dados Relevantes
+
+- [Fato/estatística 1]
+- [Fato/estatística 2]
+..."""
+
+# Instruções e rótulo da fonte por source_type (google e outros usam o genérico)
+SUMMARY_TEMPLATES = {
+    "arxiv": (SUMMARY_INSTRUCTIONS_ARXIV, "Artigo científico do arXiv"),
+    "wikipedia": (SUMMARY_INSTRUCTIONS_WIKIPEDIA, "Artigo da Wikipedia"),
+    "google": (SUMMARY_INSTRUCTIONS_SITE, "Site"),
+}
+
+# Parte variável do prompt de resumo, enviada depois das instruções
+SUMMARY_PROMPT_TEMPLATE = """{label}: "{title}" ({url})
+
+Conteúdo extraído:
+{content}"""
+
+def merge_summary_results(left: List[Dict], right: Optional[List[Dict]]) -> List[Dict]:
+    """
+    Reducer de summary_results: junta os resumos devolvidos em paralelo pelos nós summarize_one.
+    Mescla por URL (reescrever o estado inteiro não duplica entradas); None esvazia o canal.
+    """
+    if right is None:
+        return []
+    merged = {item["url"]: item for item in left}
+    for item in right:
+        merged[item["url"]] = item
+    return list(merged.values())
 
 class ResearchState(TypedDict):
     query: str
-    search_results: List[Dict]
+    search_results: List[Dict]  # Histórico de resultados de todas as buscas (sem o conteúdo extraído)
+    current_batch: List[Dict]  # Resultados da busca atual, com conteúdo, ainda não resumidos
+    current_summaries: List[Dict]  # Resumos gerados na iteração atual, ainda não analisados
+    summary_results: Annotated[List[Dict], merge_summary_results]  # Resumos dos nós summarize_one, ainda não coletados
+    enough_info: bool  # Se a última análise indicou informações suficientes
     site_summaries: List[Dict]  # Lista para armazenar resumos por site
     analysis: str
     final_report: str
@@ -27,7 +227,88 @@ class ResearchState(TypedDict):
     search_queries: List[str]
     sources: List[str]
     current_search_query: str
-    search_mode: str  # Campo para controlar o tipo de busca (google, arxiv, wikipedia)
+    search_mode: str  # Campo para controlar o tipo de busca (google, arxiv, wikipedia ou multi)
+
+# Divide um resumo em seções de nível 2 ("## ...")
+SUMMARY_SECTION_RE = re.compile(r"^(?=## )", re.MULTILINE)
+
+def extract_summary_digest(summary: str) -> str:
+    """
+    Versão compacta de um resumo de site: mantém tópicos e fatos/dados e descarta
+    a seção de resumo em prosa. Retorna o resumo inteiro se não houver seções.
+    """
+    sections = [part.strip() for part in SUMMARY_SECTION_RE.split(summary)]
+    kept = [part for part in sections if part.startswith("## ") and not part[3:].lstrip().startswith("Resumo")]
+    if not kept:
+        return summary
+    return "\n\n".join(kept)
+
+# Tipos de fonte com seção própria na análise e no relatório; os demais caem em "other"
+KNOWN_SOURCE_TYPES = ("google", "arxiv", "wikipedia")
+
+# Modo de busca das iterações de refinamento: consulta todas as fontes conhecidas
+MULTI_SOURCE_MODE = "multi"
+
+def group_by_source_type(items: List[Dict], key: str = "source_type") -> Dict[str, List[Dict]]:
+    """Agrupa itens por tipo de fonte em uma única passada"""
+    groups = defaultdict(list)
+    for item in items:
+        source_type = item.get(key)
+        groups[source_type if source_type in KNOWN_SOURCE_TYPES else "other"].append(item)
+    return groups
+
+# Seções do relatório final, na ordem de apresentação:
+# (tipo de fonte, cabeçalho dos resumos, rótulo de cada resumo, cabeçalho da lista de fontes)
+REPORT_SECTIONS = [
+    ("wikipedia", "\n=== RESUMOS DE FONTES ENCICLOPÉDICAS (WIKIPEDIA) ===\n", "RESUMO WIKIPEDIA", "\n### Fontes Enciclopédicas (Wikipedia)\n"),
+    ("arxiv", "\n=== RESUMOS DE FONTES ACADÊMICAS (ARXIV) ===\n", "RESUMO ARTIGO", "\n### Fontes Acadêmicas (arXiv)\n"),
+    ("google", "\n=== RESUMOS DE FONTES GERAIS ===\n", "RESUMO SITE", "\n### Fontes Gerais\n"),
+    ("other", "\n=== RESUMOS DE OUTRAS FONTES ===\n", "RESUMO FONTE", "\n### Outras Fontes\n"),
+]
+
+# Diretrizes do relatório final: texto fixo, enviado antes dos dados da pesquisa
+# (system prompt em modelos de chat) para que o provedor reaproveite o prefixo em cache.
+# Qualquer mudança de espaço ou pontuação invalida esse cache
+REPORT_INSTRUCTIONS = """Você vai elaborar o relatório final de uma pesquisa a partir dos dados enviados ao final: query original, queries utilizadas, resumos das fontes por tipo, análise consolidada e fontes consultadas.
+
+O relatório final deve seguir estas diretrizes:
+
+1. **Responder à query original de forma estruturada e abrangente**
+
+2. **Organizar o relatório em seções que integrem informações de diferentes tipos de fontes:**
+   - Incluir uma seção de visão geral/contexto (baseada principalmente em fontes enciclopédicas)
+   - Incluir uma seção de aspectos técnicos/científicos (baseada principalmente em fontes acadêmicas)
+   - Incluir uma seção de aplicações práticas/informações atualizadas (baseada principalmente em fontes gerais)
+
+3. **Para cada seção/tópico principal:**
+   - Fornecer um título claro
+   - Apresentar um resumo conciso (400-700 palavras) que sintetize as informações relevantes
+   - Citar apropriadamente as fontes utilizadas
+   - Destacar dados específicos, estatísticas ou fatos relevantes
+
+4. **Concluir com uma síntese integrativa:**
+   - Resumir os principais achados
+   - Identificar como as diferentes fontes se complementam
+   - Apontar qualquer questão não resolvida ou que mereça investigação adicional
+
+5. **Incluir todas as referências organizadas por tipo de fonte**
+
+Produza um relatório profissional e abrangente que integre harmoniosamente as informações de todos os tipos de fontes."""
+
+REPORT_PROMPT_TEMPLATE = """**Query original de pesquisa:**
+"{query}"
+
+**Queries utilizadas ao longo da investigação:**
+{search_queries}
+
+**Resumos dos conteúdos analisados por tipo de fonte:**
+{site_summaries}
+
+**Análise consolidada dos resultados:**
+{analysis}
+
+**Fontes consultadas:**
+{sources}"""
 
 def execute_search(query: str, search_mode: str = "google", num_results: int = 5) -> List[Dict]:
     """Função helper para executar busca de acordo com o modo selecionado"""
@@ -38,63 +319,236 @@ def execute_search(query: str, search_mode: str = "google", num_results: int = 5
     else:  # default: google
         return execute_google_search(query, num_results)
 
+def canonical_query(query: str) -> str:
+    """Forma canônica da query para memoização: termos normalizados e em ordem alfabética"""
+    return " ".join(sorted(normalize_query(query).split()))
+
+def message_content(response: Any) -> str:
+    """Texto de uma resposta de modelo de chat (AIMessage)"""
+    return response.content
+
+def text_content(response: Any) -> str:
+    """Texto de uma resposta de modelo de completude (já é str na prática)"""
+    return response if isinstance(response, str) else str(response)
+
 class DeepResearchAgent:
     def __init__(self, llm_provider: str, api_key: Optional[str] = None, 
                  model_name: Optional[str] = None, status_callback: Optional[Callable[[str, str, Any], None]] = None):
         
         self.status_callback = status_callback
+        self.llm_provider = llm_provider
+        
+        # URLs (forma canônica) já extraídas na pesquisa atual
+        self._seen_urls = set()
+        
+        # Resultados por (fonte, query canônica) na pesquisa atual: queries repetidas não são refeitas
+        self._seen_queries: Dict[Tuple[str, str], List[Dict]] = {}
+        
+        # Limite de extrações simultâneas, compartilhado por todas as buscas da pesquisa
+        # (criado em research(), dentro do event loop que vai usá-lo)
+        self._extract_semaphore: Optional[asyncio.Semaphore] = None
+        self._llm_semaphore: Optional[asyncio.Semaphore] = None
+        
+        # Token bucket por host: o semáforo limita o total de downloads, o limitador
+        # espaça as requisições a um mesmo site
+        self._host_limiters: Dict[str, RateLimiter] = defaultdict(lambda: RateLimiter(PER_HOST_RATE))
+        
+        # Fila de eventos de status, consumida por uma task durante research()
+        self._status_queue: Optional[asyncio.Queue] = None
+        self._status_task: Optional[asyncio.Task] = None
+        
+        # Tokenizer do modelo, carregado sob demanda em _get_encoding
+        self._encoding = None
+        self._encoding_loaded = False
         
         if llm_provider == "openai":
             if not api_key:
                 raise ValueError("API key necessária para OpenAI")
+            self.model_name = model_name or "gpt-3.5-turbo"
             self.llm = ChatOpenAI(
                 openai_api_key=api_key,
-                model=model_name or "gpt-3.5-turbo",
-                temperature=0.7
+                model=self.model_name,
+                temperature=0.7,
+                http_async_client=get_openai_http_client()
             )
             self.is_chat_model = True
         elif llm_provider == "ollama":
+            self.model_name = model_name or "llama2"
             self.llm = OllamaLLM(
-                model=model_name or "llama2",
+                model=self.model_name,
                 base_url="http://localhost:11434"
             )
             self.is_chat_model = False
         else:
             raise ValueError("Provider deve ser 'openai' ou 'ollama'")
         
+        # Extrator do texto da resposta, definido uma vez pelo tipo de modelo:
+        # modelos de chat devolvem mensagens, os demais devolvem texto
+        self._extract = message_content if self.is_chat_model else text_content
+        
         # Configura grafo
         self.setup_graph()
     
     def log_status(self, message: str, status_type: str = "info", data: Any = None):
-        """Log com callback opcional"""
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        print(f"[{timestamp}] {message}")
-        
+        """Log com callback opcional (enfileirado durante a pesquisa)"""
+        logger.info("%s", message)
+        self._emit_status(message, status_type, data)
+    
+    def _emit_status(self, message: str, status_type: str, data: Any = None):
+        """Entrega o evento ao callback sem registrá-lo no log (usado para trechos do relatório)"""
         if self.status_callback:
-            self.status_callback(status_type, message, data)
+            if self._status_queue is not None:
+                self._status_queue.put_nowait((status_type, message, data))
+            else:
+                self.status_callback(status_type, message, data)
     
-    def extract_content(self, response) -> str:
-        """Extrai conteúdo da resposta do LLM de forma robusta"""
-        if hasattr(response, 'content'):
-            return response.content
-        elif isinstance(response, str):
-            return response
-        else:
-            return str(response)
+    async def _drain_status(self):
+        """Entrega os eventos de status enfileirados ao callback, em ordem"""
+        while True:
+            item = await self._status_queue.get()
+            if item is None:
+                break
+            try:
+                self.status_callback(*item)
+            except Exception:
+                logger.exception("Erro no callback de status")
     
-    async def invoke_llm(self, prompt: str) -> str:
-        """Invoca LLM de forma consistente"""
+    def _start_status_queue(self):
+        """Passa a enfileirar os eventos de status, consumidos por uma task em segundo plano"""
+        self._status_queue = asyncio.Queue()
+        self._status_task = asyncio.create_task(self._drain_status())
+    
+    async def _stop_status_queue(self):
+        """Entrega os eventos pendentes e volta a chamar o callback diretamente"""
+        self._status_queue.put_nowait(None)
         try:
-            if self.is_chat_model:
-                response = await self.llm.ainvoke([HumanMessage(content=prompt)])
-            else:
-                response = await self.llm.ainvoke(prompt)
+            await self._status_task
+        finally:
+            self._status_queue = None
+            self._status_task = None
+    
+    def _get_encoding(self):
+        """Retorna o tokenizer tiktoken do modelo atual, ou None se indisponível"""
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            if TIKTOKEN_AVAILABLE:
+                try:
+                    try:
+                        self._encoding = tiktoken.encoding_for_model(self.model_name)
+                    except KeyError:
+                        # Modelo sem mapeamento conhecido: a contagem vira uma estimativa
+                        self._encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+                except Exception as e:
+                    # Arquivo BPE inacessível (ex.: máquina sem acesso à internet)
+                    logger.warning("Tokenizer indisponível para %s: %s. Truncando por caracteres.", self.model_name, e)
+        return self._encoding
+    
+    def truncate_to_tokens(self, text: str, max_tokens: int, max_chars: int) -> str:
+        """Trunca o texto pelo número de tokens do modelo (ou de caracteres, sem tokenizer)"""
+        encoding = self._get_encoding()
+        if encoding is None:
+            if len(text) > max_chars:
+                return text[:max_chars] + "... [conteúdo truncado]"
+            return text
+        
+        # Cada token cobre ao menos um byte: textos curtos dispensam a tokenização
+        if len(text.encode("utf-8")) <= max_tokens:
+            return text
+        
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) > max_tokens:
+            return encoding.decode(tokens[:max_tokens]) + "... [conteúdo truncado]"
+        return text
+    
+    def _llm_cache_key(self, prompt: str, system: Optional[str] = None) -> tuple:
+        """Chave de LLM_CACHE: provedor + modelo + hash do prompt com espaços normalizados"""
+        # Diferenças só de indentação/quebras de linha não mudam a resposta esperada
+        normalized = " ".join(prompt.split())
+        if system:
+            normalized = " ".join(system.split()) + "\x00" + normalized
+        return (
+            self.llm_provider,
+            self.model_name,
+            hashlib.blake2b(normalized.encode("utf-8"), digest_size=20).hexdigest()
+        )
+    
+    def template_cache_key(self, template_id: str, **slots: Any) -> tuple:
+        """
+        Chave de LLM_CACHE pela estrutura do prompt: id do template + valores das variáveis.
+        Prompts do mesmo template com as mesmas variáveis (já canonizadas pelo chamador)
+        compartilham a resposta, mesmo que o texto montado difira em detalhes irrelevantes.
+        """
+        canonical = json.dumps(slots, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return (
+            self.llm_provider,
+            self.model_name,
+            template_id,
+            hashlib.blake2b(canonical.encode("utf-8"), digest_size=20).hexdigest()
+        )
+    
+    def _build_llm_input(self, prompt: str, system: Optional[str] = None) -> Any:
+        """Monta a entrada do LLM: mensagens para modelos de chat, texto único para os demais"""
+        if self.is_chat_model:
+            if system:
+                return [SystemMessage(content=system), HumanMessage(content=prompt)]
+            return [HumanMessage(content=prompt)]
+        if system:
+            return f"{system}\n\n{prompt}"
+        return prompt
+    
+    async def invoke_llm(self, prompt: str, system: Optional[str] = None, cache_key: Optional[tuple] = None) -> str:
+        """
+        Invoca LLM de forma consistente, reaproveitando respostas de prompts idênticos.
+        Instruções estáticas podem ir em `system`, à frente do prompt; `cache_key`
+        (ver template_cache_key) substitui a chave derivada do texto do prompt.
+        """
+        cache_key = cache_key or self._llm_cache_key(prompt, system)
+        cached = LLM_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if self._llm_semaphore is None:
+            self._llm_semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+        
+        try:
+            async with self._llm_semaphore:
+                response = await self.llm.ainvoke(self._build_llm_input(prompt, system))
             
-            return self.extract_content(response)
+            content = self._extract(response)
+            LLM_CACHE.set(cache_key, content)
+            return content
         except Exception as e:
             self.log_status(f"Erro ao invocar LLM: {str(e)}", "error")
             raise e
     
+    async def stream_llm(self, prompt: str, system: Optional[str] = None, cache_key: Optional[tuple] = None) -> AsyncIterator[str]:
+        """
+        Invoca o LLM em modo streaming, entregando os trechos de texto à medida que são gerados.
+        A resposta completa entra no LLM_CACHE ao final; em caso de acerto, é entregue de uma vez.
+        """
+        cache_key = cache_key or self._llm_cache_key(prompt, system)
+        cached = LLM_CACHE.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        if self._llm_semaphore is None:
+            self._llm_semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+        
+        chunks: List[str] = []
+        try:
+            async with self._llm_semaphore:
+                async for chunk in self.llm.astream(self._build_llm_input(prompt, system)):
+                    text = self._extract(chunk)
+                    if text:
+                        chunks.append(text)
+                        yield text
+        except Exception as e:
+            self.log_status(f"Erro ao invocar LLM: {str(e)}", "error")
+            raise e
+        
+        LLM_CACHE.set(cache_key, "".join(chunks))
+    
     def setup_graph(self):
         """Configura o grafo LangGraph"""
         workflow = StateGraph(ResearchState)
@@ -102,14 +556,21 @@ class DeepResearchAgent:
         # Adiciona nós
         workflow.add_node("plan_search", self.plan_search)
         workflow.add_node("execute_search", self.execute_search)
-        workflow.add_node("summarize_sites", self.summarize_sites)  # Nó para resumir sites individualmente
+        workflow.add_node("summarize_one", self.summarize_one)  # Resumo de um único site (executado em paralelo)
+        workflow.add_node("summarize_sites", self.summarize_sites)  # Coleta os resumos da iteração
         workflow.add_node("analyze_results", self.analyze_results)
         workflow.add_node("generate_report", self.generate_report)
         
         # Define fluxo
         workflow.add_edge(START, "plan_search")
         workflow.add_edge("plan_search", "execute_search")
-        workflow.add_edge("execute_search", "summarize_sites")  # Nova etapa no fluxo
+        # Fan-out: um summarize_one por site extraído; o LangGraph executa todos em paralelo
+        workflow.add_conditional_edges(
+            "execute_search",
+            self.dispatch_summaries,
+            ["summarize_one", "summarize_sites"]
+        )
+        workflow.add_edge("summarize_one", "summarize_sites")
         workflow.add_edge("summarize_sites", "analyze_results")
         workflow.add_conditional_edges(
             "analyze_results",
@@ -128,7 +589,7 @@ class DeepResearchAgent:
         self.log_status("Planejando próxima busca...", "plan")
         
         # Controle da alternância de fontes de busca
-        iteration = state.get("iteration", 0)
+        iteration = state["iteration"]
         
         # Define a fonte de busca para esta iteração
         # Prioriza Google e arXiv sobre Wikipedia
@@ -145,13 +606,13 @@ class DeepResearchAgent:
             search_mode = "wikipedia"
             search_query = state["query"]
         else:
-            # Iterações seguintes: alterna entre fontes priorizadas e refina a busca
+            # Iterações seguintes: refina a busca e consulta todas as fontes em paralelo
             # Gera uma query refinada com base na análise anterior
             self.log_status(f"Gerando nova query baseada na análise anterior (Iteração {iteration})", "plan")
             
             prompt = f"""
                     A partir da consulta original: "{state['query']}"
-                    E com base na análise realizada anteriormente: "{state.get('analysis', '')}"
+                    E com base na análise realizada anteriormente: "{state['analysis']}"
                     
                     Gere uma nova **query de busca específica e refinada** que permita obter **informações complementares** e **ainda não exploradas**.
                     
@@ -163,16 +624,14 @@ class DeepResearchAgent:
             search_query = await self.invoke_llm(prompt)
             search_query = search_query.strip()
             
-            # Alterna entre os modos de busca, priorizando Google e arXiv (2:1:1 ratio)
-            search_mode_options = ["google", "arxiv", "google", "wikipedia"]
-            search_mode = search_mode_options[iteration % 4]
+            search_mode = MULTI_SOURCE_MODE
         
         # Armazena o modo de busca e a query
         state["search_mode"] = search_mode
         state["current_search_query"] = search_query
         
         # Registra as queries utilizadas
-        search_queries = state.get("search_queries", [])
+        search_queries = state["search_queries"]
         search_queries.append(f"{search_mode}: {search_query}")
         state["search_queries"] = search_queries
         
@@ -186,7 +645,7 @@ class DeepResearchAgent:
     async def execute_search(self, state: ResearchState) -> ResearchState:
         """Executa busca na fonte selecionada e extrai conteúdo das páginas"""
         query = state["current_search_query"]
-        search_mode = state.get("search_mode", "google")
+        search_mode = state["search_mode"]
         
         self.log_status(f"Executando busca: {query} (Modo: {search_mode})", "search", {
             "query": query,
@@ -194,257 +653,279 @@ class DeepResearchAgent:
         })
         
         # Executa busca na fonte apropriada
-        search_results = execute_search(query, search_mode=search_mode, num_results=5)
+        # As buscas fazem HTTP bloqueante: rodam em thread para não travar o event loop
+        if search_mode == MULTI_SOURCE_MODE:
+            search_results = await self.multi_source_search(query)
+        else:
+            search_results = await self.search_once(query, search_mode)
         
-        # Filtra resultados inválidos
-        valid_results = [r for r in search_results if not r.get('error')]
+        # Filtra resultados inválidos e páginas já extraídas em iterações anteriores
+        valid_results = []
+        for r in search_results:
+            if r.get('error'):
+                continue
+            url_key = canonical_url(r['url']) if r.get('url') else None
+            if url_key in self._seen_urls:
+                continue
+            if url_key:
+                self._seen_urls.add(url_key)
+            valid_results.append(r)
         self.log_status(f"Encontrados {len(valid_results)} resultados válidos em {search_mode}", "search", {
             "count": len(valid_results),
             "urls": [r.get('url', '') for r in valid_results[:3]],
             "source": search_mode
         })
         
-        # Extrai conteúdo de cada resultado
+        # Extrai conteúdo de todos os resultados em paralelo
+        results_with_url = [r for r in valid_results if r.get('url', '')]
+        for result in results_with_url:
+            self.log_status(f"Extraindo conteúdo de: {result['url']} ({search_mode})", "extract")
+
+        # TaskGroup: se a busca for cancelada, todas as extrações pendentes são canceladas juntas
+        async with asyncio.TaskGroup() as task_group:
+            tasks = [task_group.create_task(self.extract_page(r['url'])) for r in results_with_url]
+
         enriched_results = []
-        for result in valid_results:
-            url = result.get('url', '')
-            if url:
-                self.log_status(f"Extraindo conteúdo de: {url} ({search_mode})", "extract")
-                
-                # Extrai o conteúdo da página
-                content_data = extract_web_content(url)
-                
-                # Adiciona resultado com conteúdo extraído
-                enriched_results.append({
-                    "title": content_data.get("title", result.get("title", "")),
-                    "url": url,
-                    "snippet": result.get("snippet", ""),
-                    "content": content_data.get("content", ""),
-                    "error": content_data.get("error", False),
-                    "source_type": result.get("source_type", search_mode)
-                })
-                
-                # Log do conteúdo extraído
-                content_length = len(content_data.get("content", ""))
-                self.log_status(f"Extraídos {content_length} caracteres de {url}", "extract_detail", {
-                    "url": url,
-                    "length": content_length,
-                    "status": "ok" if content_length > 1000 else "baixo",
-                    "source": search_mode
-                })
-        
-        all_search_results = state.get("search_results", [])
-        all_search_results.extend(enriched_results)
-        state["search_results"] = all_search_results
+        for result, task in zip(results_with_url, tasks):
+            url = result['url']
+            content_data = task.result()
+
+            # Adiciona resultado com conteúdo extraído
+            enriched_results.append({
+                "title": content_data.get("title", result.get("title", "")),
+                "url": url,
+                "snippet": result.get("snippet", ""),
+                "content": content_data.get("content", ""),
+                "error": content_data.get("error", False),
+                "source_type": result.get("source_type", search_mode)
+            })
+
+            # Log do conteúdo extraído
+            content_length = len(content_data.get("content", ""))
+            self.log_status(f"Extraídos {content_length} caracteres de {url}", "extract_detail", {
+                "url": url,
+                "length": content_length,
+                "status": "ok" if content_length > 1000 else "baixo",
+                "source": search_mode
+            })
+        
+        # O lote atual segue com o conteúdo para o resumo; o histórico guarda só os metadados
+        state["current_batch"] = enriched_results
+        state["search_results"].extend(
+            {k: v for k, v in r.items() if k != "content"} for r in enriched_results
+        )
         
         self.log_status(f"Busca {search_mode} concluída: {len(enriched_results)} páginas extraídas", "search_complete")
         
         return state
     
-    async def summarize_sites(self, state: ResearchState) -> ResearchState:
-        """Gera resumos individuais para cada site com tópicos"""
-        self.log_status("Iniciando geração de resumos por site...", "site_summary")
-        
-        # Obtém os resultados da busca atual
-        recent_results = state["search_results"][-5:]  # Últimos 5 resultados
-        site_summaries = state.get("site_summaries", [])
-        search_mode = state.get("search_mode", "google")
+    async def multi_source_search(self, query: str, num_results: int = 5) -> List[Dict]:
+        """Busca a mesma query em Google, arXiv e Wikipedia ao mesmo tempo"""
+        results_by_source = await asyncio.gather(
+            *[self.search_once(query, mode, num_results) for mode in KNOWN_SOURCE_TYPES],
+            return_exceptions=True
+        )
         
-        for i, result in enumerate(recent_results):
-            if result.get('error', True) or not result.get('content'):
+        search_results = []
+        for mode, results in zip(KNOWN_SOURCE_TYPES, results_by_source):
+            if isinstance(results, Exception):
+                self.log_status(f"Erro na busca {mode}: {str(results)}", "error")
                 continue
-                
-            url = result.get('url', '')
-            title = result.get('title', '')
-            content = result.get('content', '')
-            source_type = result.get('source_type', 'site')
-            
-            # Limita o conteúdo para processamento eficiente
-            if len(content) > 8000:
-                content = content[:8000] + "... [conteúdo truncado]"
-            
-            self.log_status(f"Gerando resumo para: {title} ({source_type})", "site_summary")
-            
-            # Adapta o prompt baseado no tipo de fonte
-            if source_type == "arxiv":
-                prompt = f"""
-                    Analise o seguinte conteúdo extraído do artigo científico do arXiv "{title}" ({url}):
-                    
-                    {content}
-                    
-                    Crie um resumo estruturado seguindo estas diretrizes:
-                    
-                    1. **Identifique os principais tópicos acadêmicos** abordados no artigo.
-                    2. **Para cada tópico**, forneça um título claro e uma descrição técnica concisa.
-                    3. **Crie um resumo científico** do conteúdo completo, com 400 a 1000 palavras.
-                    4. **Extraia quaisquer resultados, métodos ou conclusões importantes** encontrados no artigo.
-                    5. **Destaque a relevância acadêmica** deste artigo para o tema da pesquisa.
-                    
-                    Formato esperado:
-                    
-                    ## Tópicos Principais
-                    
-                    ### [Tópico 1]
-                    [Descrição técnica]
-                    
-                    ### [Tópico 2]
-                    [Descrição técnica]
-                    
-                    ...
-                    
-                    ## Resumo Científico (300-600 palavras)
-                    
-                    [Seu resumo aqui]
-                    
-                    ## Dados e Resultados Relevantes
-                    
-                    - [Resultado/método 1]
-                    - [Resultado/método 2]
-                    ...
-                    """
-            elif source_type == "wikipedia":
-                prompt = f"""
-                    Analise o seguinte conteúdo extraído do artigo da Wikipedia "{title}" ({url}):
-                    
-                    {content}
-                    
-                    Crie um resumo estruturado seguindo estas diretrizes:
-                    
-                    1. **Identifique de 3 a 5 tópicos principais** abordados no artigo.
-                    2. **Para cada tópico**, forneça um título claro e um resumo informativo.
-                    3. **Crie um resumo enciclopédico** do conteúdo completo, com 300 a 600 palavras.
-                    4. **Extraia fatos, datas, definições e informações contextuais** importantes.
-                    5. **Destaque as conexões com outros tópicos relevantes** mencionados no artigo.
-                    
-                    Formato esperado:
-                    
-                    ## Tópicos Principais
-                    
-                    ### [Tópico 1]
-                    [Resumo informativo]
-                    
-                    ### [Tópico 2]
-                    [Resumo informativo]
-                    
-                    ...
-                    
-                    ## Resumo Enciclopédico (300-600 palavras)
-                    
-                    [Seu resumo aqui]
-                    
-                    ## Fatos e Informações Importantes
-                    
-                    - [Fato/definição 1]
-                    - [Fato/definição 2]
-                    ...
-                    """
-            else:  # google ou outro
-                prompt = f"""
-                    Analise o seguinte conteúdo extraído do site "{title}" ({url}):
-                    
-                    {content}
-                    
-                    Crie um resumo estruturado seguindo estas diretrizes:
-                    
-                    1. **Identifique de 3 a 5 tópicos principais** abordados no conteúdo.
-                    2. **Para cada tópico**, forneça um título claro e uma breve descrição.
-                    3. **Crie um resumo abrangente** do conteúdo completo, com 300 a 600 palavras.
-                    4. **Extraia quaisquer fatos, estatísticas ou dados relevantes** encontrados no conteúdo.
-                    
-                    Formato esperado:
-                    
-                    ## Tópicos Principais
-                    
-                    ### [Tópico 1]
-                    [Breve descrição]
-                    
-                    ### [Tópico 2]
-                    [Breve descrição]
-                    
-                    ...
-                    
-                    ## Resumo Geral (300-600 palavras)
-                    
-                    [Seu resumo completo aqui]
-                    
-                    ## Dados Relevantes
-                    
-                    - [Fato/estatística 1]
-                    - [Fato/estatística 2]
-                    ...
-                    """
-            
+            search_results.extend(results)
+        return search_results
+    
+    async def search_once(self, query: str, search_mode: str, num_results: int = 5) -> List[Dict]:
+        """Busca em uma fonte, reaproveitando o resultado se a mesma query já foi feita nesta pesquisa"""
+        key = (search_mode, canonical_query(query))
+        if key in self._seen_queries:
+            self.log_status(f"Query já pesquisada em {search_mode}, reaproveitando resultados: {query}", "search")
+            return self._seen_queries[key]
+        
+        search_results = await asyncio.to_thread(execute_search, query, search_mode, num_results)
+        self._seen_queries[key] = search_results
+        return search_results
+    
+    async def extract_page(self, url: str) -> Dict:
+        """Extrai o conteúdo de uma página respeitando o limite de extrações simultâneas; nunca levanta exceção"""
+        if self._extract_semaphore is None:
+            self._extract_semaphore = asyncio.Semaphore(MAX_CONCURRENT_EXTRACTIONS)
+        
+        # Espera a vez no host antes de ocupar uma vaga de download
+        await self._host_limiters[urlsplit(url).netloc.lower()].acquire()
+        
+        # Limita o número de downloads simultâneos para não sobrecarregar os sites
+        async with self._extract_semaphore:
             try:
-                summary_content = await self.invoke_llm(prompt)
-                
-                site_summaries.append({
-                    "title": title,
-                    "url": url,
-                    "summary": summary_content,
-                    "source_type": source_type
-                })
-                
-                self.log_status(f"Resumo gerado para: {title} ({source_type})", "site_summary_complete", {
-                    "url": url,
-                    "length": len(summary_content),
-                    "source_type": source_type
-                })
+                # extract_web_content é bloqueante, então roda no pool de threads de extração
+                loop = asyncio.get_running_loop()
+                return await asyncio.wait_for(
+                    loop.run_in_executor(EXTRACTION_EXECUTOR, extract_web_content, url),
+                    EXTRACTION_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                # Libera a vaga e o lote; o resultado da thread ainda em andamento é descartado
+                return {
+                    "title": url,
+                    "content": f"Tempo limite de extração excedido ({EXTRACTION_TIMEOUT}s)",
+                    "error": True
+                }
             except Exception as e:
-                self.log_status(f"Erro ao gerar resumo para {url}: {str(e)}", "error")
+                # Falha em uma página não deve cancelar as demais extrações do grupo
+                return {
+                    "title": url,
+                    "content": f"Erro ao processar página: {str(e)}",
+                    "error": True
+                }
+    
+    def dispatch_summaries(self, state: ResearchState) -> Union[List[Send], str]:
+        """Distribui os sites extraídos da busca atual entre nós summarize_one paralelos"""
+        self.log_status("Iniciando geração de resumos por site...", "site_summary")
+        
+        valid_results = [r for r in state["current_batch"] if not r.get('error', True) and r.get('content')]
+        if not valid_results:
+            return "summarize_sites"
+        return [Send("summarize_one", {"result": result}) for result in valid_results]
+    
+    async def summarize_one(self, payload: Dict) -> Dict:
+        """Gera o resumo com tópicos de um único site; uma falha afeta apenas este site"""
+        result = payload["result"]
+        url = result.get('url', '')
+        title = result.get('title', '')
+        source_type = result.get('source_type', 'site')
+        
+        self.log_status(f"Gerando resumo para: {title} ({source_type})", "site_summary")
+        
+        instructions, prompt = self.build_summary_prompt(result)
+        try:
+            # O prompt de resumo não depende da query: o mesmo site rende o mesmo resumo
+            cache_key = self.template_cache_key("site_summary_v1", source_type=source_type, url=canonical_url(url))
+            summary_content = await self.invoke_llm(prompt, system=instructions, cache_key=cache_key)
+        except Exception as e:
+            self.log_status(f"Erro ao gerar resumo para {url}: {str(e)}", "error")
+            return {"summary_results": []}
+        
+        self.log_status(f"Resumo gerado para: {title} ({source_type})", "site_summary_complete", {
+            "url": url,
+            "length": len(summary_content),
+            "source_type": source_type
+        })
+        
+        return {"summary_results": [{
+            "title": title,
+            "url": url,
+            "summary": summary_content,
+            # Tópicos e fatos, sem a prosa: é o que a análise consome
+            "digest": extract_summary_digest(summary_content),
+            "source_type": source_type
+        }]}
+    
+    async def summarize_sites(self, state: ResearchState) -> ResearchState:
+        """Coleta os resumos gerados pelos nós summarize_one da iteração atual"""
+        # Mantém a ordem dos resultados da busca, independente da ordem de conclusão
+        by_url = {item["url"]: item for item in state["summary_results"]}
+        current_summaries = [by_url[r.get('url', '')] for r in state["current_batch"] if r.get('url', '') in by_url]
         
+        site_summaries = state["site_summaries"]
+        site_summaries.extend(current_summaries)
         state["site_summaries"] = site_summaries
-        self.log_status(f"Concluída geração de resumos para {len(site_summaries)} fontes ({search_mode})", "site_summaries_complete")
+        state["current_summaries"] = current_summaries
+        state["current_batch"] = []
+        state["summary_results"] = None
+        self.log_status(f"Concluída geração de resumos para {len(site_summaries)} fontes ({state['search_mode']})", "site_summaries_complete")
         
         return state
     
+    def build_summary_prompt(self, result: Dict) -> Tuple[str, str]:
+        """
+        Monta o prompt de resumo de um site de acordo com o tipo de fonte.
+        
+        Returns:
+            Tupla (instruções estáticas, conteúdo do site)
+        """
+        url = result.get('url', '')
+        title = result.get('title', '')
+        content = result.get('content', '')
+        source_type = result.get('source_type', 'site')
+        
+        # Limita o conteúdo para processamento eficiente
+        content = self.truncate_to_tokens(content, SUMMARY_INPUT_MAX_TOKENS, SUMMARY_INPUT_MAX_CHARS)
+        
+        # Instruções estáticas por tipo de fonte; só o bloco final varia por site
+        instructions, label = SUMMARY_TEMPLATES.get(source_type, SUMMARY_TEMPLATES["google"])
+        prompt = SUMMARY_PROMPT_TEMPLATE.format(label=label, title=title, url=url, content=content)
+        
+        return instructions, prompt
+    
     async def analyze_results(self, state: ResearchState) -> ResearchState:
         """Analisa resumos dos sites para gerar análise consolidada"""
-        iteration = state.get("iteration", 0) + 1
-        self.log_status(f"Analisando resultados (Iteração {iteration}/{state.get('max_iterations', 5)})", "analyze")
+        iteration = state["iteration"] + 1
+        self.log_status(f"Analisando resultados (Iteração {iteration}/{state['max_iterations']})", "analyze")
+        
+        # Obtém apenas os resumos ainda não analisados
+        recent_summaries = state["current_summaries"]
+        state["current_summaries"] = []
+        search_mode = state["search_mode"]
         
-        # Obtém os resumos de sites mais recentes
-        recent_summaries = state.get("site_summaries", [])[-5:]
-        search_mode = state.get("search_mode", "google")
+        # Sem conteúdo novo não há o que analisar: mantém a análise anterior
+        if not recent_summaries:
+            state["iteration"] = iteration
+            self.log_status(f"Nenhum resumo novo para analisar - Iteração {iteration} ({search_mode})", "analyze_complete", {
+                "iteration": iteration,
+                "mode": search_mode,
+                "insights_preview": ""
+            })
+            return state
         
         # Agrupa resumos por tipo de fonte
-        google_summaries = [s for s in recent_summaries if s.get('source_type') == 'google']
-        arxiv_summaries = [s for s in recent_summaries if s.get('source_type') == 'arxiv']
-        wikipedia_summaries = [s for s in recent_summaries if s.get('source_type') == 'wikipedia']
+        groups = group_by_source_type(recent_summaries)
+        google_summaries = groups["google"]
+        arxiv_summaries = groups["arxiv"]
+        wikipedia_summaries = groups["wikipedia"]
         
         # Prepara texto consolidado de resumos por tipo
-        summaries_text = ""
+        parts = []
         
         if google_summaries:
-            summaries_text += "\n=== RESUMOS DE SITES GERAIS ===\n"
+            parts.append("\n=== RESUMOS DE SITES GERAIS ===\n")
             for i, summary in enumerate(google_summaries):
-                summaries_text += f"\n--- RESUMO DO SITE {i+1} ---\n"
-                summaries_text += f"Título: {summary.get('title', '')}\n"
-                summaries_text += f"URL: {summary.get('url', '')}\n"
-                summaries_text += f"Conteúdo:\n{summary.get('summary', '')}\n\n"
+                parts.append(
+                    f"\n--- RESUMO DO SITE {i+1} ---\n"
+                    f"Título: {summary.get('title', '')}\n"
+                    f"URL: {summary.get('url', '')}\n"
+                    f"Conteúdo:\n{summary.get('digest') or summary.get('summary', '')}\n\n"
+                )
         
         if wikipedia_summaries:
-            summaries_text += "\n=== RESUMOS DA WIKIPEDIA ===\n"
+            parts.append("\n=== RESUMOS DA WIKIPEDIA ===\n")
             for i, summary in enumerate(wikipedia_summaries):
-                summaries_text += f"\n--- RESUMO WIKIPEDIA {i+1} ---\n"
-                summaries_text += f"Título: {summary.get('title', '')}\n"
-                summaries_text += f"URL: {summary.get('url', '')}\n"
-                summaries_text += f"Conteúdo:\n{summary.get('summary', '')}\n\n"
+                parts.append(
+                    f"\n--- RESUMO WIKIPEDIA {i+1} ---\n"
+                    f"Título: {summary.get('title', '')}\n"
+                    f"URL: {summary.get('url', '')}\n"
+                    f"Conteúdo:\n{summary.get('digest') or summary.get('summary', '')}\n\n"
+                )
         
         if arxiv_summaries:
-            summaries_text += "\n=== RESUMOS DE ARTIGOS CIENTÍFICOS ===\n"
+            parts.append("\n=== RESUMOS DE ARTIGOS CIENTÍFICOS ===\n")
             for i, summary in enumerate(arxiv_summaries):
-                summaries_text += f"\n--- RESUMO ARTIGO {i+1} ---\n"
-                summaries_text += f"Título: {summary.get('title', '')}\n"
-                summaries_text += f"URL: {summary.get('url', '')}\n"
-                summaries_text += f"Conteúdo:\n{summary.get('summary', '')}\n\n"
+                parts.append(
+                    f"\n--- RESUMO ARTIGO {i+1} ---\n"
+                    f"Título: {summary.get('title', '')}\n"
+                    f"URL: {summary.get('url', '')}\n"
+                    f"Conteúdo:\n{summary.get('digest') or summary.get('summary', '')}\n\n"
+                )
         
         # Se não há resumos categorizados, usa o formato antigo
-        if not summaries_text:
+        if not parts:
             for i, summary in enumerate(recent_summaries):
-                summaries_text += f"\n--- RESUMO {i+1} ---\n"
-                summaries_text += f"Título: {summary.get('title', '')}\n"
-                summaries_text += f"URL: {summary.get('url', '')}\n"
-                summaries_text += f"Conteúdo:\n{summary.get('summary', '')}\n\n"
+                parts.append(
+                    f"\n--- RESUMO {i+1} ---\n"
+                    f"Título: {summary.get('title', '')}\n"
+                    f"URL: {summary.get('url', '')}\n"
+                    f"Conteúdo:\n{summary.get('digest') or summary.get('summary', '')}\n\n"
+                )
+        
+        summaries_text = "".join(parts)
         
         prompt = f"""
             Consulta original: "{state['query']}"
@@ -452,7 +933,7 @@ class DeepResearchAgent:
             Resumos das fontes analisadas:
             {summaries_text}
             
-            Análise anterior: "{state.get('analysis', 'Nenhuma análise anterior')}"
+            Análise anterior: "{state['analysis']}"
             
             Com base nos resumos das diferentes fontes, realize as seguintes tarefas:
             
@@ -477,8 +958,10 @@ class DeepResearchAgent:
         analysis_content = await self.invoke_llm(prompt)
         
         # Atualiza análise
-        current_analysis = state.get("analysis", "")
+        current_analysis = state["analysis"]
         state["analysis"] = current_analysis + "\n\n" + analysis_content
+        # Só o trecho novo precisa ser verificado: análises anteriores já foram
+        state["enough_info"] = ENOUGH_INFO_RE.search(analysis_content) is not None
         state["iteration"] = iteration
         
         # Log de preview da análise
@@ -494,15 +977,15 @@ class DeepResearchAgent:
     
     def should_continue(self, state: ResearchState) -> str:
         """Decide se deve continuar pesquisando"""
-        current_iteration = state.get("iteration", 0)
-        max_iterations = state.get("max_iterations", 5)
+        current_iteration = state["iteration"]
+        max_iterations = state["max_iterations"]
         
         if current_iteration >= max_iterations:
             self.log_status(f"Número máximo de iterações atingido ({max_iterations})", "decision")
             return "finish"
         
-        analysis = state.get("analysis", "")
-        if len(analysis) > 2000 and "informações suficientes" in analysis.lower():
+        analysis = state["analysis"]
+        if len(analysis) > 2000 and state["enough_info"]:
             self.log_status("Informações suficientes coletadas", "decision")
             return "finish"
         
@@ -513,176 +996,77 @@ class DeepResearchAgent:
         """Gera relatório final"""
         self.log_status("Gerando relatório final...", "report")
         
-        total_results = len(state.get("search_results", []))
-        total_queries = len(state.get("search_queries", []))
-        total_summaries = len(state.get("site_summaries", []))
-        
-        # Agrupa resumos por tipo de fonte
-        google_summaries = [s for s in state.get("site_summaries", []) if s.get('source_type') == 'google']
-        arxiv_summaries = [s for s in state.get("site_summaries", []) if s.get('source_type') == 'arxiv']
-        wikipedia_summaries = [s for s in state.get("site_summaries", []) if s.get('source_type') == 'wikipedia']
-        
-        # Formata fontes para o prompt, agrupadas por tipo
-        sources = []
-        site_summaries_text = ""
+        site_summaries = state["site_summaries"]
+        total_results = len(state["search_results"])
+        total_queries = len(state["search_queries"])
+        total_summaries = len(site_summaries)
         
-        # Processa fontes da Wikipedia
-        if wikipedia_summaries:
-            site_summaries_text += "\n=== RESUMOS DE FONTES ENCICLOPÉDICAS (WIKIPEDIA) ===\n"
-            for i, summary in enumerate(wikipedia_summaries):
-                if summary.get("url") and summary.get("title"):
-                    sources.append({
-                        "title": summary.get("title", ""),
-                        "url": summary.get("url", ""),
-                        "type": "wikipedia"
-                    })
-                    
-                    site_summaries_text += f"\n--- RESUMO WIKIPEDIA {i+1} ---\n"
-                    site_summaries_text += f"Título: {summary.get('title', '')}\n"
-                    site_summaries_text += f"URL: {summary.get('url', '')}\n"
-                    site_summaries_text += f"Resumo:\n{summary.get('summary', '')}\n\n"
-        
-        # Processa fontes acadêmicas (arXiv)
-        if arxiv_summaries:
-            site_summaries_text += "\n=== RESUMOS DE FONTES ACADÊMICAS (ARXIV) ===\n"
-            for i, summary in enumerate(arxiv_summaries):
-                if summary.get("url") and summary.get("title"):
-                    sources.append({
-                        "title": summary.get("title", ""),
-                        "url": summary.get("url", ""),
-                        "type": "arxiv"
-                    })
-                    
-                    site_summaries_text += f"\n--- RESUMO ARTIGO {i+1} ---\n"
-                    site_summaries_text += f"Título: {summary.get('title', '')}\n"
-                    site_summaries_text += f"URL: {summary.get('url', '')}\n"
-                    site_summaries_text += f"Resumo:\n{summary.get('summary', '')}\n\n"
-        
-        # Processa fontes gerais (Google)
-        if google_summaries:
-            site_summaries_text += "\n=== RESUMOS DE FONTES GERAIS ===\n"
-            for i, summary in enumerate(google_summaries):
-                if summary.get("url") and summary.get("title"):
-                    sources.append({
-                        "title": summary.get("title", ""),
-                        "url": summary.get("url", ""),
-                        "type": "google"
-                    })
-                    
-                    site_summaries_text += f"\n--- RESUMO SITE {i+1} ---\n"
-                    site_summaries_text += f"Título: {summary.get('title', '')}\n"
-                    site_summaries_text += f"URL: {summary.get('url', '')}\n"
-                    site_summaries_text += f"Resumo:\n{summary.get('summary', '')}\n\n"
-        
-        # Para fontes não categorizadas
-        other_summaries = [s for s in state.get("site_summaries", []) if s.get('source_type') not in ['google', 'arxiv', 'wikipedia']]
-        if other_summaries:
-            site_summaries_text += "\n=== RESUMOS DE OUTRAS FONTES ===\n"
-            for i, summary in enumerate(other_summaries):
-                if summary.get("url") and summary.get("title"):
-                    sources.append({
-                        "title": summary.get("title", ""),
-                        "url": summary.get("url", ""),
-                        "type": "other"
-                    })
-                    
-                    site_summaries_text += f"\n--- RESUMO FONTE {i+1} ---\n"
-                    site_summaries_text += f"Título: {summary.get('title', '')}\n"
-                    site_summaries_text += f"URL: {summary.get('url', '')}\n"
-                    site_summaries_text += f"Resumo:\n{summary.get('summary', '')}\n\n"
-        
-        # Remove duplicatas mantendo a informação de tipo
-        unique_sources = []
-        seen_urls = set()
-        for source in sources:
-            if source["url"] not in seen_urls:
-                unique_sources.append(source)
-                seen_urls.add(source["url"])
-        
-        # Formata fontes para o prompt, agrupadas por tipo
-        sources_by_type = {
-            "wikipedia": [s for s in unique_sources if s.get("type") == "wikipedia"],
-            "arxiv": [s for s in unique_sources if s.get("type") == "arxiv"],
-            "google": [s for s in unique_sources if s.get("type") == "google"],
-            "other": [s for s in unique_sources if s.get("type") == "other"]
-        }
-        
-        sources_text = ""
-        
-        if sources_by_type["wikipedia"]:
-            sources_text += "\n### Fontes Enciclopédicas (Wikipedia)\n"
-            for s in sources_by_type["wikipedia"]:
-                sources_text += f"- {s['title']} ({s['url']})\n"
-        
-        if sources_by_type["arxiv"]:
-            sources_text += "\n### Fontes Acadêmicas (arXiv)\n"
-            for s in sources_by_type["arxiv"]:
-                sources_text += f"- {s['title']} ({s['url']})\n"
+        # Uma única passada: descarta resumos sem URL/título ou com URL repetida
+        # (o dict preserva a ordem de inserção) e agrupa por tipo de fonte
+        by_url = {}
+        by_type = defaultdict(list)
+        for summary in site_summaries:
+            url = summary.get("url")
+            if not url or not summary.get("title") or url in by_url:
+                continue
+            by_url[url] = summary
+            source_type = summary.get("source_type")
+            by_type[source_type if source_type in KNOWN_SOURCE_TYPES else "other"].append(summary)
         
-        if sources_by_type["google"]:
-            sources_text += "\n### Fontes Gerais\n"
-            for s in sources_by_type["google"]:
-                sources_text += f"- {s['title']} ({s['url']})\n"
+        # Formata resumos e fontes para o prompt, agrupados por tipo
+        summary_parts = []
+        sources_parts = []
+        for source_type, summaries_header, entry_label, sources_header in REPORT_SECTIONS:
+            summaries = by_type[source_type]
+            if not summaries:
+                continue
+            
+            summary_parts.append(summaries_header)
+            sources_parts.append(sources_header)
+            for i, summary in enumerate(summaries):
+                summary_parts.append(
+                    f"\n--- {entry_label} {i+1} ---\n"
+                    f"Título: {summary['title']}\n"
+                    f"URL: {summary['url']}\n"
+                    f"Resumo:\n{summary.get('summary', '')}\n\n"
+                )
+                sources_parts.append(f"- {summary['title']} ({summary['url']})\n")
         
-        if sources_by_type["other"]:
-            sources_text += "\n### Outras Fontes\n"
-            for s in sources_by_type["other"]:
-                sources_text += f"- {s['title']} ({s['url']})\n"
+        site_summaries_text = "".join(summary_parts)
+        sources_text = "".join(sources_parts)
         
         state["sources"] = sources_text
         
-        self.log_status(f"Compilando dados de {total_results} resultados e {total_queries} buscas em {len(unique_sources)} fontes", "report", {
+        self.log_status(f"Compilando dados de {total_results} resultados e {total_queries} buscas em {len(by_url)} fontes", "report", {
             "total_results": total_results,
             "total_queries": total_queries,
-            "sources_count": len(unique_sources),
-            "wikipedia_count": len(sources_by_type["wikipedia"]),
-            "arxiv_count": len(sources_by_type["arxiv"]),
-            "google_count": len(sources_by_type["google"])
+            "sources_count": len(by_url),
+            "wikipedia_count": len(by_type["wikipedia"]),
+            "arxiv_count": len(by_type["arxiv"]),
+            "google_count": len(by_type["google"])
         })
         
-        prompt = f"""
-            **Query original de pesquisa:**  
-            "{state['query']}"
-            
-            **Queries utilizadas ao longo da investigação:**  
-            {', '.join(state.get('search_queries', []))}
-            
-            **Resumos dos conteúdos analisados por tipo de fonte:**
-            {site_summaries_text}
-            
-            **Análise consolidada dos resultados:**  
-            {state.get('analysis', '')}
-            
-            **Fontes consultadas:**
-            {sources_text}
-            
-            O relatório final deve seguir estas diretrizes:
-            
-            1. **Responder à query original de forma estruturada e abrangente**
-            
-            2. **Organizar o relatório em seções que integrem informações de diferentes tipos de fontes:**
-               - Incluir uma seção de visão geral/contexto (baseada principalmente em fontes enciclopédicas)
-               - Incluir uma seção de aspectos técnicos/científicos (baseada principalmente em fontes acadêmicas)
-               - Incluir uma seção de aplicações práticas/informações atualizadas (baseada principalmente em fontes gerais)
-            
-            3. **Para cada seção/tópico principal:**
-               - Fornecer um título claro
-               - Apresentar um resumo conciso (400-700 palavras) que sintetize as informações relevantes
-               - Citar apropriadamente as fontes utilizadas
-               - Destacar dados específicos, estatísticas ou fatos relevantes
-            
-            4. **Concluir com uma síntese integrativa:**
-               - Resumir os principais achados 
-               - Identificar como as diferentes fontes se complementam
-               - Apontar qualquer questão não resolvida ou que mereça investigação adicional
-            
-            5. **Incluir todas as referências organizadas por tipo de fonte**
-            
-            Produza um relatório profissional e abrangente que integre harmoniosamente as informações de todos os tipos de fontes.
-            """
+        prompt = REPORT_PROMPT_TEMPLATE.format(
+            query=state['query'],
+            search_queries=', '.join(state['search_queries']),
+            site_summaries=site_summaries_text,
+            analysis=state['analysis'],
+            sources=sources_text
+        )
         
         self.log_status("Processando relatório final com LLM...", "report")
-        report_content = await self.invoke_llm(prompt)
+        report_chunks: List[str] = []
+        # Mesma query (ignorando caixa/espaços) sobre o mesmo conjunto de fontes reaproveita o relatório
+        cache_key = self.template_cache_key(
+            "final_report_v2",
+            query=normalize_query(state["query"]),
+            sources=sorted(canonical_url(url) for url in by_url)
+        )
+        async for chunk in self.stream_llm(prompt, system=REPORT_INSTRUCTIONS, cache_key=cache_key):
+            report_chunks.append(chunk)
+            # Trechos vão direto ao cliente, sem uma linha de log por token
+            self._emit_status(chunk, "report_chunk")
+        report_content = "".join(report_chunks)
         state["final_report"] = report_content
         
         self.log_status("Relatório final gerado com sucesso!", "report_complete", {
@@ -694,7 +1078,23 @@ class DeepResearchAgent:
     
     async def research(self, query: str, max_iterations: int = 3) -> str:
         """Executa pesquisa completa"""
+        self._start_status_queue()
+        try:
+            return await self._run_research(query, max_iterations)
+        finally:
+            # Garante que todos os eventos cheguem ao callback antes do retorno
+            await self._stop_status_queue()
+    
+    async def _run_research(self, query: str, max_iterations: int) -> str:
+        """Executa o pipeline de pesquisa e monta o relatório final"""
         self.log_status(f"Iniciando pesquisa: {query}", "start", {"query": query, "max_iterations": max_iterations})
+        self._seen_urls.clear()
+        self._seen_queries.clear()
+        self._extract_semaphore = asyncio.Semaphore(MAX_CONCURRENT_EXTRACTIONS)
+        self._llm_semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+        
+        # Carrega o tokenizer fora do event loop (pode baixar o arquivo BPE na primeira vez)
+        await asyncio.to_thread(self._get_encoding)
         
         initial_state: ResearchState = {
             "query": query,
@@ -707,7 +1107,11 @@ class DeepResearchAgent:
             "final_report": "",
             "sources": [],
             "current_search_query": "",
-            "search_mode": "google"  # Modo inicial de busca
+            "search_mode": "google",  # Modo inicial de busca
+            "current_batch": [],
+            "current_summaries": [],
+            "summary_results": [],
+            "enough_info": False
         }
         
         try:
@@ -1,27 +1,71 @@
 # main.py
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse, Response
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from typing import Optional, AsyncGenerator, Any, Dict
 import asyncio
 from deep_research_agent import DeepResearchAgent
-import uvicorn
+from search.html_parser import enable_parse_pool
 import logging
 import json
 from datetime import datetime
 import uuid
-from collections import defaultdict
+import sys
+from collections import Counter, defaultdict, deque
+import heapq
+from contextlib import asynccontextmanager
+from functools import lru_cache
 import time
 
+try:
+    import uvloop  # noqa: F401
+    EVENT_LOOP = "uvloop"
+except ImportError:
+    # uvloop não existe no Windows; usa o loop padrão do asyncio
+    EVENT_LOOP = "asyncio"
+    print("Biblioteca uvloop não encontrada. Para um event loop mais rápido, instale com: pip install uvloop")
 
-logging.basicConfig(level=logging.INFO)
+try:
+    import httptools  # noqa: F401
+    HTTP_IMPL = "httptools"
+except ImportError:
+    # Parser HTTP em Python puro, sempre disponível com o uvicorn
+    HTTP_IMPL = "h11"
+    print("Biblioteca httptools não encontrada. Para um parser HTTP mais rápido, instale com: pip install httptools")
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    print("Biblioteca orjson não encontrada. Para serialização JSON mais rápida, instale com: pip install orjson")
+
+
+# Mesmo formato dos logs de status do agente: "[HH:MM:SS] mensagem"
+logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(message)s", datefmt="%H:%M:%S")
 logger = logging.getLogger(__name__)
 
+# Intervalo (segundos) da limpeza automática de pesquisas antigas
+CLEANUP_INTERVAL = 3600
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Mantém a limpeza periódica de pesquisas antigas enquanto o servidor está ativo"""
+    # Servidor no ar via server.py ou uvicorn: o __main__ é leve, e os processos de parsing
+    # (spawn) carregam só o módulo de parsing
+    enable_parse_pool()
+    cleanup_task = asyncio.create_task(periodic_cleanup())
+    try:
+        yield
+    finally:
+        cleanup_task.cancel()
+
 app = FastAPI(
     title="Deep Research Service",
     description="Deep Research IA",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 
@@ -33,11 +77,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Histórico de eventos mantido por pesquisa: os mais antigos saem quando o limite é atingido.
+# Clientes conectados recebem tudo pela fila; só o replay de quem chega depois é parcial
+MAX_EVENTS_PER_RESEARCH = 1000
+
 # Armazenamento de eventos e estado das pesquisas
-research_events = defaultdict(list)
+research_events = defaultdict(lambda: deque(maxlen=MAX_EVENTS_PER_RESEARCH))
 research_tasks = {}  # Novo dicionário para armazenar estado e resultados das pesquisas
+research_subscribers = defaultdict(set)  # Filas dos clientes SSE conectados a cada pesquisa
+research_expiry = []  # Heap de (instante de expiração, research_id), a mais antiga no topo
+
+# Contadores mantidos a cada transição, para o /health não percorrer todas as pesquisas
+status_counts = Counter()  # status -> número de pesquisas nesse status
+stored_events = 0  # Eventos guardados em research_events, somando todas as pesquisas
+
+RESEARCH_TTL = 86400  # Pesquisas são removidas 24 horas após o início
+
+# Eventos de status do agente emitidos dentro desta janela (segundos) saem em um único evento "batch"
+STATUS_BATCH_WINDOW = 0.05
+pending_status = defaultdict(list)  # Eventos de status aguardando o próximo lote
+pending_flush = {}  # research_id -> envio agendado do lote
+
+SSE_HEARTBEAT_INTERVAL = 15  # segundos sem eventos até enviar um heartbeat
+SSE_MAX_WAIT_TIME = 1800  # 30 minutos de timeout do stream
+SSE_HEARTBEAT = b": heartbeat\n\n"
+SUBSCRIBER_QUEUE_SIZE = 10_000  # Eventos pendentes por cliente; acima disso os mais antigos são descartados
 
 class ResearchRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     query: str
     llm_provider: str 
     api_key: Optional[str] = None
@@ -45,104 +113,223 @@ class ResearchRequest(BaseModel):
     max_iterations: int = 3
 
 class ResearchResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     result: str
     status: str = "processing"
     research_id: str
 
-def create_sse_message(event_type: str, data: dict) -> str:
-    """Cria mensagem SSE formatada"""
-    json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
-    json_data = json_data.replace('\n', ' ').replace('\r', '')
+# Serializador pronto da resposta: a rota devolve os bytes sem passar pelo encoder do FastAPI
+RESEARCH_RESPONSE_ADAPTER = TypeAdapter(ResearchResponse)
+
+@lru_cache(maxsize=64)
+def sse_frame_prefix(event_type: str) -> bytes:
+    """Início do frame ("event: ...\ndata: "), codificado uma única vez por tipo de evento"""
+    return b"event: " + event_type.encode('utf-8') + b"\ndata: "
+
+# Timestamp ISO com resolução de segundos, formatado no máximo uma vez por segundo
+_timestamp_second = 0
+_timestamp_iso = ""
 
-    message = f"event: {event_type}\n"
-    message += f"data: {json_data}\n\n"
-    return message
+def current_timestamp() -> str:
+    """Horário atual em ISO 8601 (segundos), reaproveitado por todos os eventos do mesmo segundo"""
+    global _timestamp_second, _timestamp_iso
+    now = int(time.time())
+    if now != _timestamp_second:
+        _timestamp_second = now
+        _timestamp_iso = datetime.fromtimestamp(now).isoformat()
+    return _timestamp_iso
 
-async def event_stream(research_id: str) -> AsyncGenerator[str, None]:
+def create_sse_message(event_type: str, data: dict) -> bytes:
+    """Cria mensagem SSE formatada, já em bytes UTF-8"""
+    # Quebras de linha dentro de strings já saem escapadas, então o JSON ocupa uma única linha
+    if ORJSON_AVAILABLE:
+        json_data = orjson.dumps(data)
+    else:
+        json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    return b"".join((sse_frame_prefix(event_type), json_data, b"\n\n"))
+
+def publish_event(research_id: str, event: dict, final: bool = False):
+    """
+    Registra o evento no histórico da pesquisa e o entrega às filas dos clientes conectados.
+    Eventos finais (conclusão, falha ou cancelamento da pesquisa) encerram o stream SSE.
+    """
+    global stored_events
+    # Erros e conclusão reportados pelo próprio agente não encerram o stream,
+    # apenas os do ciclo de vida da pesquisa
+    if final:
+        # Eventos de status ainda no lote saem antes do evento final
+        flush_status_batch(research_id)
+        task_info = research_tasks.get(research_id)
+        if task_info is not None:
+            # Só o primeiro evento final conta: o stream já terminou nele
+            # (ex.: pesquisa cancelada cujo agente conclui depois)
+            if task_info.get("completion_sent"):
+                logger.info(f"[{research_id}] Evento final ignorado: {event['type']}")
+                return
+            task_info["completion_sent"] = True
+        # Marca no evento (para o event_stream) e no payload: o cliente encerra
+        # o stream neste evento e usa o "result" dele, sem consultar o backend
+        event["final"] = True
+        event["data"]["final"] = True
+    # Serializa uma única vez; o mesmo frame vai para todos os clientes e para os replays
+    event["frame"] = create_sse_message(event["type"], event["data"])
+    events = research_events[research_id]
+    if len(events) < events.maxlen:
+        # Com o histórico cheio, o append só substitui o evento mais antigo
+        stored_events += 1
+    events.append(event)
+    for queue in research_subscribers.get(research_id, ()):
+        enqueue_event(queue, event, research_id)
+
+def enqueue_event(queue: asyncio.Queue, event: dict, research_id: str):
+    """Entrega o evento a um cliente; com a fila cheia (cliente lento), descarta o evento mais antigo"""
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        dropped = queue.get_nowait()
+        queue.put_nowait(event)
+        logger.warning(f"[{research_id}] Cliente SSE lento: evento descartado ({dropped['type']})")
+
+def flush_status_batch(research_id: str):
+    """Publica os eventos de status acumulados: um evento sozinho segue como está, vários viram um lote ("batch")"""
+    handle = pending_flush.pop(research_id, None)
+    if handle is not None:
+        handle.cancel()
+    events = pending_status.pop(research_id, None)
+    if not events:
+        return
+    if len(events) == 1:
+        publish_event(research_id, events[0])
+    else:
+        publish_event(research_id, {
+            "type": "batch",
+            "data": {"events": events}
+        })
+
+class EventSubscription:
+    """
+    Inscrição de um cliente SSE em uma pesquisa: o histórico no momento da inscrição
+    (replay) e, via `async for`, os eventos seguintes. A iteração devolve None a cada
+    SSE_HEARTBEAT_INTERVAL sem eventos e termina ao atingir o prazo (deadline, monotônico).
+    """
+    
+    def __init__(self, research_id: str, deadline: float):
+        self.research_id = research_id
+        self.deadline = deadline
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.replay = []
+        # Leitura pendente da fila, preservada entre heartbeats
+        self._get_task: Optional[asyncio.Task] = None
+    
+    def __enter__(self):
+        # Inscreve a fila antes de copiar o histórico: nenhum evento se perde entre os dois
+        research_subscribers[self.research_id].add(self.queue)
+        self.replay = list(research_events[self.research_id])
+        return self
+    
+    def __exit__(self, *exc_info):
+        if self._get_task is not None:
+            self._get_task.cancel()
+        subscribers = research_subscribers.get(self.research_id)
+        if subscribers is not None:
+            subscribers.discard(self.queue)
+            if not subscribers:
+                del research_subscribers[self.research_id]
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self) -> Optional[dict]:
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise StopAsyncIteration
+        # Uma única espera cobre evento, heartbeat e prazo. asyncio.wait não levanta
+        # TimeoutError: um intervalo sem eventos não cria exceção nem perde a leitura em curso
+        if self._get_task is None:
+            self._get_task = asyncio.create_task(self.queue.get())
+        done, _ = await asyncio.wait({self._get_task}, timeout=min(SSE_HEARTBEAT_INTERVAL, remaining))
+        if done:
+            event = self._get_task.result()
+            self._get_task = None
+            return event
+        if time.monotonic() >= self.deadline:
+            raise StopAsyncIteration
+        return None
+    
+    def get_nowait(self) -> Optional[dict]:
+        """Próximo evento já disponível na fila, sem esperar; None se não houver"""
+        if self._get_task is not None:
+            return None
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+async def event_stream(research_id: str) -> AsyncGenerator[bytes, None]:
     """Gera stream de eventos SSE"""
     logger.info(f"Cliente conectado ao stream: {research_id}")
 
     yield create_sse_message("connected", {
         "message": "Conectado ao stream de eventos",
         "research_id": research_id,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": current_timestamp()
     })
     
-    sent_index = 0
-    max_wait_time = 1800  # 30 minutos de timeout (aumentado de 5 para 30 minutos)
-    start_time = time.time()
-    last_heartbeat = time.time()
-    
-    while True:
-        current_time = time.time()
+    with EventSubscription(research_id, time.monotonic() + SSE_MAX_WAIT_TIME) as subscription:
+        # Reenvia o histórico para clientes que conectam depois do início da pesquisa,
+        # num único envio
+        finished = False
+        frames = []
+        for event in subscription.replay:
+            frames.append(event["frame"])
+            if event.get("final"):
+                finished = True
+                break
+        if frames:
+            yield b"".join(frames)
         
-        # Verifica timeout global
-        if current_time - start_time > max_wait_time:
+        if not finished:
+            # Sem sleeps: o loop só acorda com um evento ou com um intervalo sem eventos (None)
+            async for event in subscription:
+                if event is None:
+                    yield SSE_HEARTBEAT
+                    continue
+                # Eventos que chegaram em rajada e já estão na fila saem juntos, numa única escrita
+                frames = [event["frame"]]
+                finished = bool(event.get("final"))
+                while not finished:
+                    event = subscription.get_nowait()
+                    if event is None:
+                        break
+                    frames.append(event["frame"])
+                    finished = bool(event.get("final"))
+                yield b"".join(frames)
+                if finished:
+                    break
+        
+        if finished:
+            logger.info(f"Pesquisa finalizada: {research_id}")
+        else:
+            # A iteração só termina sem evento final ao atingir o timeout global
             yield create_sse_message("timeout", {
                 "message": "Timeout do stream",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": current_timestamp()
             })
             
             # Verifica se temos resultado parcial para enviar
-            if research_id in research_tasks and "partial_result" in research_tasks[research_id]:
+            if research_id in research_tasks:
                 yield create_sse_message("complete", {
                     "message": "Pesquisa concluída parcialmente devido a timeout",
-                    "result": research_tasks[research_id]["partial_result"],
-                    "timestamp": datetime.now().isoformat()
+                    "result": current_partial_result(research_tasks[research_id]),
+                    "timestamp": current_timestamp(),
+                    "final": True
                 })
-            
-            break
-        
-        # Envia heartbeat a cada 15 segundos
-        if current_time - last_heartbeat > 15:
-            yield ": heartbeat\n\n"
-            last_heartbeat = current_time
-
-        # Verifica resultado disponível
-        if research_id in research_tasks and research_tasks[research_id].get("status") == "completed":
-            # Verifica se já enviamos evento de conclusão
-            completion_sent = False
-            for event in research_events[research_id]:
-                if event["type"] == "complete":
-                    completion_sent = True
-                    break
-                    
-            # Se não enviamos, adiciona evento de conclusão com o resultado
-            if not completion_sent and "result" in research_tasks[research_id]:
-                result_event = {
-                    "type": "complete",
-                    "data": {
-                        "message": "Pesquisa concluída com sucesso",
-                        "result": research_tasks[research_id]["result"],
-                        "timestamp": datetime.now().isoformat()
-                    }
-                }
-                research_events[research_id].append(result_event)
-        
-        # Processa eventos pendentes
-        if research_id in research_events:
-            events = research_events[research_id]
-
-            while sent_index < len(events):
-                event = events[sent_index]
-                yield create_sse_message(event["type"], event["data"])
-                sent_index += 1
-                
-                # Heartbeat a cada 5 eventos
-                if sent_index % 5 == 0:
-                    yield ": heartbeat\n\n"
-            
-            # Verifica se temos eventos finais
-            if events and events[-1]["type"] in ["complete", "error", "cancelled"]:
-                logger.info(f"Pesquisa finalizada: {research_id}")
-                break
-        
-        # Pequena pausa antes da próxima verificação
-        await asyncio.sleep(0.1)
     
     yield create_sse_message("disconnected", {
         "message": "Stream finalizado",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": current_timestamp()
     })
 
 @app.get("/research/stream/{research_id}")
@@ -155,23 +342,27 @@ async def research_stream(research_id: str, request: Request):
         return StreamingResponse(
             [create_sse_message("error", {
                 "message": "Pesquisa não encontrada",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": current_timestamp(),
+                "final": True
             })],
             media_type="text/event-stream"
         )
     
     async def event_generator():
+        # O StreamingResponse já monitora a desconexão e cancela o gerador,
+        # então não é preciso consultar request.is_disconnected() a cada evento
         try:
             async for event in event_stream(research_id):
-                if await request.is_disconnected():
-                    logger.info(f"Cliente desconectado: {research_id}")
-                    break
                 yield event
+        except asyncio.CancelledError:
+            logger.info(f"Cliente desconectado: {research_id}")
+            raise
         except Exception as e:
             logger.error(f"Erro no stream: {str(e)}")
             yield create_sse_message("error", {
                 "message": f"Erro no stream: {str(e)}",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": current_timestamp(),
+                "final": True
             })
     
     return StreamingResponse(
@@ -184,22 +375,48 @@ async def research_stream(research_id: str, request: Request):
         }
     )
 
+def set_research_status(research_id: str, status: str):
+    """Muda o status da pesquisa, mantendo status_counts em dia"""
+    task_info = research_tasks[research_id]
+    status_counts[task_info["status"]] -= 1
+    task_info["status"] = status
+    status_counts[status] += 1
+
+def current_partial_result(task_info: dict) -> str:
+    """Resultado parcial: o relatório final já gerado, se houver, ou as análises intermediárias"""
+    if task_info.get("report_chunks"):
+        return "".join(task_info["report_chunks"])
+    return task_info.get("partial_result", "")
+
 def status_callback_factory(research_id: str):
     """Cria callback para capturar status do agente"""
     def callback(status_type: str, message: str, data: Any = None):
+        # Um único timestamp por evento, usado também em last_update
+        timestamp = current_timestamp()
         event = {
             "type": status_type,
             "data": {
                 "message": message,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp,
                 "details": data or {}
             }
         }
-        research_events[research_id].append(event)
+        # Agrupa os eventos próximos no tempo: menos frames SSE e menos trabalho por cliente
+        pending_status[research_id].append(event)
+        if research_id not in pending_flush:
+            pending_flush[research_id] = asyncio.get_running_loop().call_later(
+                STATUS_BATCH_WINDOW, flush_status_batch, research_id
+            )
+        
+        # Trechos do relatório em streaming: só acumula o rascunho, sem log por trecho
+        if status_type == "report_chunk":
+            if research_id in research_tasks:
+                research_tasks[research_id]["report_chunks"].append(message)
+            return
         
         # Atualiza estado da pesquisa
         if research_id in research_tasks:
-            research_tasks[research_id]["last_update"] = datetime.now().isoformat()
+            research_tasks[research_id]["last_update"] = timestamp
             research_tasks[research_id]["last_message"] = message
             
             # Captura a análise como resultado parcial quando disponível
@@ -231,8 +448,11 @@ def status_callback_factory(research_id: str):
 @app.post("/research", response_model=ResearchResponse)
 async def research_endpoint(request: ResearchRequest):
     """Endpoint para iniciar pesquisa com streaming"""
-    research_id = str(uuid.uuid4())
+    # 32 caracteres hexadecimais, sem hífens; internado, pois é chave de vários dicionários
+    research_id = sys.intern(uuid.uuid4().hex)
     logger.info(f"Nova pesquisa iniciada: {research_id} - {request.query[:50]}...")
+    start_time = current_timestamp()
+    heapq.heappush(research_expiry, (time.time() + RESEARCH_TTL, research_id))
     
     # Inicializa o estado da pesquisa
     research_tasks[research_id] = {
@@ -243,17 +463,19 @@ async def research_endpoint(request: ResearchRequest):
             "model": request.model_name,
             "max_iterations": request.max_iterations
         },
-        "start_time": datetime.now().isoformat(),
+        "start_time": start_time,
         "progress": 0,
-        "partial_result": ""
+        "partial_result": "",
+        "report_chunks": []  # Relatório final recebido até agora (streaming do LLM)
     }
+    status_counts["started"] += 1
     
-    research_events[research_id].append({
+    publish_event(research_id, {
         "type": "init",
         "data": {
             "message": f"Pesquisa iniciada: {request.query}",
             "query": request.query,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": start_time,
             "details": {
                 "provider": request.llm_provider,
                 "model": request.model_name,
@@ -265,11 +487,12 @@ async def research_endpoint(request: ResearchRequest):
     # Inicia tarefa em background
     asyncio.create_task(execute_research(research_id, request))
     
-    return ResearchResponse(
+    response = ResearchResponse(
         result="Pesquisa iniciada. Use o endpoint /research/stream/{research_id} para acompanhar o progresso.",
         status="processing",
         research_id=research_id
     )
+    return Response(content=RESEARCH_RESPONSE_ADAPTER.dump_json(response), media_type="application/json")
 
 async def execute_research(research_id: str, request: ResearchRequest):
     """Executa a pesquisa em background"""
@@ -285,7 +508,7 @@ async def execute_research(research_id: str, request: ResearchRequest):
             raise ValueError("Provider deve ser 'openai' ou 'ollama'")
         
         # Atualiza estado
-        research_tasks[research_id]["status"] = "running"
+        set_research_status(research_id, "running")
         
         # Cria instância do agente com callback
         agent = DeepResearchAgent(
@@ -308,20 +531,22 @@ async def execute_research(research_id: str, request: ResearchRequest):
             )
             
             # Atualiza estado e adiciona evento de conclusão
-            research_tasks[research_id]["status"] = "completed"
+            set_research_status(research_id, "completed")
             research_tasks[research_id]["result"] = result
+            research_tasks[research_id]["report_chunks"] = []  # Rascunho substituído pelo resultado
             research_tasks[research_id]["progress"] = 100
-            research_tasks[research_id]["completion_time"] = datetime.now().isoformat()
+            completion_time = current_timestamp()
+            research_tasks[research_id]["completion_time"] = completion_time
             
             # Adiciona evento de conclusão
-            research_events[research_id].append({
+            publish_event(research_id, {
                 "type": "complete",
                 "data": {
                     "message": "Pesquisa concluída com sucesso",
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": completion_time,
                     "result": result
                 }
-            })
+            }, final=True)
             
             logger.info(f"[{research_id}] Pesquisa concluída com sucesso")
             
@@ -331,48 +556,48 @@ async def execute_research(research_id: str, request: ResearchRequest):
             logger.error(f"[{research_id}] {error_msg}")
             
             # Pega resultado parcial se existir
-            partial_result = research_tasks[research_id].get("partial_result", "")
+            partial_result = current_partial_result(research_tasks[research_id])
             if not partial_result:
                 partial_result = "# Resultado Parcial (Timeout)\n\nA pesquisa excedeu o tempo limite antes de ser concluída."
             
             # Atualiza estado
-            research_tasks[research_id]["status"] = "timeout"
+            set_research_status(research_id, "timeout")
             research_tasks[research_id]["result"] = partial_result
             
             # Adiciona evento de erro com resultado parcial
-            research_events[research_id].append({
+            publish_event(research_id, {
                 "type": "error",
                 "data": {
                     "message": error_msg,
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": current_timestamp(),
                     "error": "timeout",
                     "result": partial_result
                 }
-            })
+            }, final=True)
             
     except Exception as e:
         error_msg = f"Erro durante pesquisa: {str(e)}"
         logger.error(f"[{research_id}] {error_msg}")
 
         # Pega resultado parcial se existir
-        partial_result = research_tasks[research_id].get("partial_result", "")
+        partial_result = current_partial_result(research_tasks[research_id])
         
         # Atualiza estado
-        research_tasks[research_id]["status"] = "failed"
+        set_research_status(research_id, "failed")
         research_tasks[research_id]["error"] = str(e)
         if partial_result:
             research_tasks[research_id]["result"] = f"# Resultado Parcial (Erro)\n\n{partial_result}\n\n## Erro\n\n{str(e)}"
         
         # Adiciona evento de erro
-        research_events[research_id].append({
+        publish_event(research_id, {
             "type": "error",
             "data": {
                 "message": error_msg,
                 "error": str(e),
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": current_timestamp(),
                 "result": partial_result if partial_result else None
             }
-        })
+        }, final=True)
 
 @app.get("/research/{research_id}")
 async def get_research_result(research_id: str):
@@ -406,7 +631,7 @@ async def get_research_result(research_id: str):
         }
     # Se a pesquisa ainda estiver em andamento, retorna o resultado parcial
     elif status in ["running", "started"]:
-        partial_result = task_info.get("partial_result", "")
+        partial_result = current_partial_result(task_info)
         progress = task_info.get("progress", 0)
         return {
             "research_id": research_id,
@@ -470,74 +695,74 @@ async def cancel_research(research_id: str):
         }
     
     # Atualiza estado
-    task_info["status"] = "cancelled"
+    set_research_status(research_id, "cancelled")
     
     # Adiciona evento de cancelamento
-    research_events[research_id].append({
+    publish_event(research_id, {
         "type": "cancelled",
         "data": {
             "message": "Pesquisa cancelada pelo usuário",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": current_timestamp(),
+            "result": current_partial_result(task_info) or None
         }
-    })
+    }, final=True)
     
     return {"message": "Pesquisa cancelada", "research_id": research_id}
 
+def remove_old_research() -> int:
+    """Remove estado e eventos das pesquisas iniciadas há mais de 24 horas"""
+    global stored_events
+    # Só as entradas expiradas saem do heap: O(K log N) para K pesquisas removidas
+    now = time.time()
+    count = 0
+    while research_expiry and research_expiry[0][0] <= now:
+        _, research_id = heapq.heappop(research_expiry)
+        task_info = research_tasks.pop(research_id, None)
+        if task_info is not None:
+            status_counts[task_info["status"]] -= 1
+            count += 1
+        events = research_events.pop(research_id, None)
+        if events is not None:
+            stored_events -= len(events)
+        # Lote de status ainda agendado e inscrições pendentes também saem com a pesquisa
+        handle = pending_flush.pop(research_id, None)
+        if handle is not None:
+            handle.cancel()
+        pending_status.pop(research_id, None)
+        research_subscribers.pop(research_id, None)
+    
+    return count
+
+async def periodic_cleanup():
+    """Limpa pesquisas antigas a cada CLEANUP_INTERVAL, sem depender de chamadas ao endpoint"""
+    while True:
+        await asyncio.sleep(CLEANUP_INTERVAL)
+        count = remove_old_research()
+        if count:
+            logger.info(f"Limpeza automática: {count} pesquisas removidas")
+
 @app.get("/cleanup-old-research")
 async def cleanup_old_research():
     """Limpa pesquisas antigas (admin)"""
-    now = datetime.now()
-    count = 0
-    
-    for research_id in list(research_tasks.keys()):
-        task_info = research_tasks[research_id]
-        
-        # Converte string de data para objeto datetime
-        start_time_str = task_info.get("start_time", "")
-        if not start_time_str:
-            continue
-            
-        try:
-            start_time = datetime.fromisoformat(start_time_str)
-            # Se a pesquisa tem mais de 24 horas
-            if (now - start_time).days >= 1:
-                del research_tasks[research_id]
-                if research_id in research_events:
-                    del research_events[research_id]
-                count += 1
-        except:
-            pass
-    
+    count = remove_old_research()
     return {"message": f"Limpeza concluída. {count} pesquisas removidas."}
 
 @app.get("/health")
 async def health_check():
     """Endpoint de verificação de saúde"""
-    active_count = 0
-    completed_count = 0
-    failed_count = 0
-    
-    for task_id, task_info in research_tasks.items():
-        status = task_info.get("status", "unknown")
-        if status in ["started", "running"]:
-            active_count += 1
-        elif status == "completed":
-            completed_count += 1
-        elif status in ["failed", "timeout", "cancelled"]:
-            failed_count += 1
-    
+    # Leitura direta dos contadores: O(1), independente do número de pesquisas
     return {
         "status": "healthy",
         "message": "Deep Research Service está funcionando",
         "version": "2.0.0",
         "tasks": {
-            "active": active_count,
-            "completed": completed_count,
-            "failed": failed_count,
+            "active": status_counts["started"] + status_counts["running"],
+            "completed": status_counts["completed"],
+            "failed": status_counts["failed"] + status_counts["timeout"] + status_counts["cancelled"],
             "total": len(research_tasks)
         },
         "events": {
-            "total": sum(len(events) for events in research_events.values())
+            "total": stored_events
         }
     }
 
@@ -559,9 +784,6 @@ async def root():
     }
 
 if __name__ == "__main__":
-    uvicorn.run(
-        app, 
-        host="0.0.0.0", 
-        port=8000,
-        log_level="info"
-    )
\ No newline at end of file
+    # O servidor sobe pelo server.py: com main.py como __main__, cada processo do pool
+    # de parsing (spawn) reimportaria toda a aplicação
+    print("Inicie o backend com: python server.py (ou: uvicorn main:app)")
@@ -1,9 +1,22 @@
 #arxiv_search.py
-from typing import Dict, List
-import requests
+from typing import Dict, List, Optional
 import xml.etree.ElementTree as ET
 from bs4 import BeautifulSoup
 from langchain_core.tools import tool
+from search.cache import TTLCache, normalize_query
+from search.http_client import SESSION, declared_encoding, read_limited
+from search.html_parser import HTML_PARSER, run_in_parse_pool
+
+# Feed Atom da API do arXiv
+ARXIV_NS = {"atom": "http://www.w3.org/2005/Atom"}
+ENTRY_TAG = "{http://www.w3.org/2005/Atom}entry"
+MAX_RESULTS = 3
+
+# Limite de HTML lido da página de resumo; título, autores e resumo ficam bem no início
+MAX_HTML_BYTES = 200_000
+
+# Resultados de busca ficam em cache por 1 hora
+SEARCH_CACHE = TTLCache(maxsize=512, ttl=3600)
 
 @tool
 def arxiv_search_tool(query: str) -> List[Dict]:
@@ -13,49 +26,62 @@ def arxiv_search_tool(query: str) -> List[Dict]:
         params = {
             "search_query": f"all:{query}",
             "start": 0,
-            "max_results": 3,
+            "max_results": MAX_RESULTS,
             "sortBy": "relevance",
             "sortOrder": "descending"
         }
         
-        response = requests.get(base_url, params=params, timeout=10)
+        response = SESSION.get(base_url, params=params, timeout=10, stream=True)
         
         if response.status_code != 200:
+            response.close()
             return [{"error": f"Erro na busca arXiv: Status {response.status_code}", "source_type": "arxiv"}]
         
-        # Parse XML response
-        root = ET.fromstring(response.content)
-        
-        # Define namespace
-        ns = {"atom": "http://www.w3.org/2005/Atom"}
-        
         results = []
-        entries = root.findall(".//atom:entry", ns)
-        
-        for entry in entries:
-            title_elem = entry.find("atom:title", ns)
-            summary_elem = entry.find("atom:summary", ns)
-            link_elem = entry.find("./atom:link[@title='pdf']", ns)
-            
-            if title_elem is not None and link_elem is not None:
-                title = title_elem.text.strip() if title_elem.text else "Sem título"
-                summary = summary_elem.text.strip() if summary_elem is not None and summary_elem.text else "Sem resumo"
-                url = link_elem.get("href", "").replace("pdf", "abs")  # Get abstract page instead of PDF
+        # Parse incremental do feed: cada <entry> é processada ao terminar de chegar
+        # e descartada em seguida, sem montar a árvore inteira
+        response.raw.decode_content = True
+        try:
+            for _, entry in ET.iterparse(response.raw, events=("end",)):
+                if entry.tag != ENTRY_TAG:
+                    continue
+                
+                title_elem = entry.find("atom:title", ARXIV_NS)
+                summary_elem = entry.find("atom:summary", ARXIV_NS)
+                link_elem = entry.find("./atom:link[@title='pdf']", ARXIV_NS)
+                
+                if title_elem is not None and link_elem is not None:
+                    title = title_elem.text.strip() if title_elem.text else "Sem título"
+                    summary = summary_elem.text.strip() if summary_elem is not None and summary_elem.text else "Sem resumo"
+                    url = link_elem.get("href", "").replace("pdf", "abs")  # Get abstract page instead of PDF
+                    
+                    results.append({
+                        "title": title,
+                        "url": url,
+                        "snippet": summary[:200] + "..." if len(summary) > 200 else summary,
+                        "source_type": "arxiv"
+                    })
                 
-                results.append({
-                    "title": title,
-                    "url": url,
-                    "snippet": summary[:200] + "..." if len(summary) > 200 else summary,
-                    "source_type": "arxiv"
-                })
+                entry.clear()
+                if len(results) >= MAX_RESULTS:
+                    break
+        finally:
+            response.close()
         
         return results
     except Exception as e:
         return [{"error": f"Erro na busca arXiv: {str(e)}", "source_type": "arxiv"}]
 
 def execute_arxiv_search(query: str, num_results: int = 5) -> List[Dict]:
-    """Função helper para executar busca no arXiv"""
-    return arxiv_search_tool.invoke({"query": query})
+    """Função helper para executar busca no arXiv (com cache por query)"""
+    cache_key = (normalize_query(query), num_results)
+    results = SEARCH_CACHE.get(cache_key)
+    if results is None:
+        results = arxiv_search_tool.invoke({"query": query})
+        # Não guarda falhas, para que a próxima chamada tente novamente
+        if not any(r.get("error") for r in results):
+            SEARCH_CACHE.set(cache_key, results)
+    return results
 
 def extract_arxiv_content(url: str, timeout: int, headers: Dict) -> Dict[str, str]:
     """Extrai conteúdo específico de páginas do arXiv"""
@@ -64,9 +90,10 @@ def extract_arxiv_content(url: str, timeout: int, headers: Dict) -> Dict[str, st
         if url.endswith('.pdf'):
             url = url.replace('/pdf/', '/abs/').rstrip('.pdf')
         
-        response = requests.get(url, timeout=timeout, headers=headers)
+        response = SESSION.get(url, timeout=timeout, headers=headers, stream=True)
         
         if response.status_code != 200:
+            response.close()
             return {
                 "title": url,
                 "url": url,
@@ -74,59 +101,9 @@ def extract_arxiv_content(url: str, timeout: int, headers: Dict) -> Dict[str, st
                 "error": True
             }
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extrai título
-        title = "Artigo arXiv"
-        title_elem = soup.select_one('.title')
-        if title_elem:
-            title = title_elem.get_text().replace('Title:', '').strip()
-        
-        # Extrai autores
-        authors = []
-        author_elems = soup.select('.authors a')
-        for author in author_elems:
-            authors.append(author.get_text().strip())
-        
-        # Extrai resumo
-        abstract = ""
-        abstract_elem = soup.select_one('.abstract')
-        if abstract_elem:
-            abstract = abstract_elem.get_text().replace('Abstract:', '').strip()
-        
-        # Extrai outras informações relevantes
-        categories = []
-        cat_elems = soup.select('.tablecell.subjects .arxiv-link')
-        for cat in cat_elems:
-            categories.append(cat.get_text().strip())
-        
-        date_submitted = ""
-        date_elem = soup.select_one('.dateline')
-        if date_elem:
-            date_submitted = date_elem.get_text().strip()
-        
-        # Combina tudo em um conteúdo estruturado
-        content = f"""
-        Título: {title}
-        
-        Autores: {', '.join(authors)}
-        
-        Data: {date_submitted}
-        
-        Categorias: {', '.join(categories)}
-        
-        Resumo:
-        {abstract}
-        
-        URL: {url}
-        """
-        
-        return {
-            "title": title,
-            "url": url,
-            "content": content,
-            "error": False
-        }
+        html = read_limited(response, MAX_HTML_BYTES)
+        # Parsing (CPU) no pool de processos, fora do GIL das threads de extração
+        return run_in_parse_pool(parse_arxiv_page, html, url, declared_encoding(response))
         
     except Exception as e:
         return {
@@ -134,4 +111,60 @@ def extract_arxiv_content(url: str, timeout: int, headers: Dict) -> Dict[str, st
             "url": url,
             "content": f"Erro ao processar página arXiv: {str(e)}",
             "error": True
-        }
\ No newline at end of file
+        }
+
+def parse_arxiv_page(html: bytes, url: str, encoding: Optional[str] = None) -> Dict[str, str]:
+    """Extrai título, autores, resumo e categorias do HTML de uma página de resumo do arXiv"""
+    soup = BeautifulSoup(html, HTML_PARSER, from_encoding=encoding)
+
+    # Extrai título
+    title = "Artigo arXiv"
+    title_elem = soup.select_one('.title')
+    if title_elem:
+        title = title_elem.get_text().replace('Title:', '').strip()
+
+    # Extrai autores
+    authors = []
+    author_elems = soup.select('.authors a')
+    for author in author_elems:
+        authors.append(author.get_text().strip())
+
+    # Extrai resumo
+    abstract = ""
+    abstract_elem = soup.select_one('.abstract')
+    if abstract_elem:
+        abstract = abstract_elem.get_text().replace('Abstract:', '').strip()
+
+    # Extrai outras informações relevantes
+    categories = []
+    cat_elems = soup.select('.tablecell.subjects .arxiv-link')
+    for cat in cat_elems:
+        categories.append(cat.get_text().strip())
+
+    date_submitted = ""
+    date_elem = soup.select_one('.dateline')
+    if date_elem:
+        date_submitted = date_elem.get_text().strip()
+
+    # Combina tudo em um conteúdo estruturado
+    content = f"""
+    Título: {title}
+
+    Autores: {', '.join(authors)}
+
+    Data: {date_submitted}
+
+    Categorias: {', '.join(categories)}
+
+    Resumo:
+    {abstract}
+
+    URL: {url}
+    """
+
+    return {
+        "title": title,
+        "url": url,
+        "content": content,
+        "error": False
+    }
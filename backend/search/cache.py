@@ -0,0 +1,86 @@
+#cache.py
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import time
+
+# Parâmetros de rastreamento que não alteram o conteúdo da página
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'ref', 'ref_src'}
+
+class TTLCache:
+    """Cache LRU em memória com expiração por tempo, seguro para uso entre threads"""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna o valor armazenado ou None se ausente/expirado"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Armazena o valor, descartando as entradas menos usadas se necessário"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+class SingleFlight:
+    """Agrupa chamadas simultâneas com a mesma chave: só a primeira executa, as demais aguardam o resultado dela"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = Lock()
+
+    def run(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Executa fn() ou, se já houver uma execução em andamento para a chave, espera por ela"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+def normalize_query(query: str) -> str:
+    """Normaliza a query para uso como chave de cache"""
+    return " ".join(query.casefold().split())
+
+def canonical_url(url: str) -> str:
+    """Forma canônica da URL: esquema/host em minúsculas, sem fragmento nem parâmetros de rastreamento"""
+    parts = urlsplit(url.strip())
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS
+    ]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ''))
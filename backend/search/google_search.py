@@ -1,8 +1,6 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from googlesearch import search
-import requests
-from bs4 import BeautifulSoup
-import re
+import os
 
 try:
     from newspaper import Article
@@ -12,14 +10,40 @@ except ImportError:
     print("Biblioteca newspaper3k não encontrada. Para melhor extração de conteúdo, instale com: pip install newspaper3k")
 
 from langchain_core.tools import tool
+from search.cache import SingleFlight, TTLCache, normalize_query, canonical_url
+from search.http_client import SESSION, USER_AGENT, declared_encoding, read_limited
+from search.html_parser import parse_html_in_pool
+
+# Chave opcional da API Serper (google.serper.dev): quando definida, a busca é feita
+# em uma única requisição JSON, sem o scraping e as pausas do googlesearch-python
+SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+SERPER_URL = "https://google.serper.dev/search"
+
+# Resultados de busca e páginas extraídas ficam em cache por 1 hora
+SEARCH_CACHE = TTLCache(maxsize=512, ttl=3600)
+CONTENT_CACHE = TTLCache(maxsize=1024, ttl=3600)
+
+# Extrações simultâneas da mesma página (pesquisas em paralelo) compartilham um único download
+CONTENT_INFLIGHT = SingleFlight()
+
+# Limite de HTML lido por página; 500 KB rendem bem mais que os 20000 caracteres
+# de texto mantidos, e páginas gigantes deixam de ser baixadas por inteiro
+MAX_HTML_BYTES = 500_000
+
+# Tipos de conteúdo aceitos pela extração genérica (PDFs, vídeos etc. são ignorados)
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
 
 @tool
 def google_search_tool(query: str) -> List[Dict]:
-    """Ferramenta para buscar no Google usando googlesearch-python"""
+    """Ferramenta para buscar no Google usando a API Serper ou googlesearch-python"""
+    if SERPER_API_KEY:
+        return _serper_search(query, num_results=5)
+
     try:
         results = []
-        # Busca com número fixo de resultados
-        search_results = list(search(query, num_results=5, sleep_interval=1))
+        # Busca com número fixo de resultados. Cinco resultados cabem na primeira página,
+        # e a biblioteca dorme sleep_interval mesmo depois dela: sem pausa, nada se perde
+        search_results = list(search(query, num_results=5, sleep_interval=0))
         
         for i, url in enumerate(search_results):
             try:
@@ -41,13 +65,46 @@ def google_search_tool(query: str) -> List[Dict]:
     except Exception as e:
         return [{"error": f"Erro na busca Google: {str(e)}", "source_type": "google"}]
 
+def _serper_search(query: str, num_results: int = 5) -> List[Dict]:
+    """Busca no Google via API Serper: títulos, snippets e URLs em uma única chamada"""
+    try:
+        response = SESSION.post(
+            SERPER_URL,
+            json={"q": query, "num": num_results},
+            headers={"X-API-KEY": SERPER_API_KEY},
+            timeout=10
+        )
+        response.raise_for_status()
+        
+        results = []
+        for item in response.json().get("organic", [])[:num_results]:
+            results.append({
+                "title": item.get("title") or item.get("link", ""),
+                "url": item.get("link", ""),
+                "snippet": item.get("snippet", ""),
+                "source_type": "google"
+            })
+        return results
+    except Exception as e:
+        return [{"error": f"Erro na busca Google (Serper): {str(e)}", "source_type": "google"}]
+
 def execute_google_search(query: str, num_results: int = 5) -> List[Dict]:
-    """Função helper para executar busca no Google"""
-    return google_search_tool.invoke({"query": query})
+    """Função helper para executar busca no Google (com cache por query)"""
+    cache_key = (normalize_query(query), num_results)
+    results = SEARCH_CACHE.get(cache_key)
+    if results is None:
+        results = google_search_tool.invoke({"query": query})
+        # Não guarda falhas, para que a próxima chamada tente novamente
+        if not any(r.get("error") for r in results):
+            SEARCH_CACHE.set(cache_key, results)
+    return results
 
 def extract_web_content(url: str, timeout: int = 10) -> Dict[str, str]:
     """
     Extrai o conteúdo de uma página web, incluindo texto principal.
+    Páginas extraídas com sucesso ficam em cache pela forma canônica da URL
+    (sem fragmento nem parâmetros de rastreamento), e chamadas simultâneas
+    para a mesma página esperam um único download.
     
     Args:
         url: URL da página a ser acessada
@@ -56,16 +113,57 @@ def extract_web_content(url: str, timeout: int = 10) -> Dict[str, str]:
     Returns:
         Dicionário com título, URL e conteúdo extraído
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    cache_key = canonical_url(url)
+    content_data = CONTENT_CACHE.get(cache_key)
+    if content_data is None:
+        content_data = CONTENT_INFLIGHT.run(cache_key, lambda: _fetch_and_cache(url, cache_key, timeout))
+    return content_data
+
+def _fetch_and_cache(url: str, cache_key: str, timeout: int) -> Dict[str, str]:
+    """Extrai a página e guarda no cache se não houve erro"""
+    content_data = _extract_web_content(url, timeout)
+    if not content_data.get("error"):
+        CONTENT_CACHE.set(cache_key, content_data)
+    return content_data
+
+def _extract_with_newspaper(url: str, timeout: int) -> Optional[Dict[str, str]]:
+    """
+    Extrai o texto principal com newspaper3k.
+    Roda na mesma thread de trabalho de extract_web_content (pool dedicado
+    EXTRACTION_EXECUTOR do agente, via loop.run_in_executor), então várias URLs
+    são processadas em paralelo sem bloquear o event loop.
+    
+    Returns:
+        Dicionário com o conteúdo ou None se o texto extraído for insuficiente
+    """
+    try:
+        # Só o texto interessa: sem download de imagens nem cache de artigos em disco
+        article = Article(url, fetch_images=False, memoize_articles=False,
+                          request_timeout=timeout, browser_user_agent=USER_AGENT)
+        article.download()
+        article.parse()
+        
+        if article.text and len(article.text) > 500:
+            return {
+                "title": article.title or url,
+                "url": url,
+                "content": article.text,
+                "error": False
+            }
+    except Exception as e:
+        print(f"Falha ao extrair com newspaper3k: {str(e)}. Tentando método alternativo.")
+    return None
+
+def _extract_web_content(url: str, timeout: int) -> Dict[str, str]:
+    """Faz o download e a extração de conteúdo de uma página web"""
+    headers = {'User-Agent': USER_AGENT}
     
     try:
         # Casos especiais redirecionados para módulos específicos
         if 'arxiv.org' in url:
             try:
                 # Importação dinâmica para evitar referências circulares
-                from arxiv_search import extract_arxiv_content
+                from search.arxiv_search import extract_arxiv_content
                 return extract_arxiv_content(url, timeout, headers)
             except ImportError:
                 print("Módulo arxiv_search não disponível, usando extração genérica")
@@ -73,31 +171,22 @@ def extract_web_content(url: str, timeout: int = 10) -> Dict[str, str]:
         if 'wikipedia.org' in url:
             try:
                 # Importação dinâmica para evitar referências circulares
-                from backend.search.wikipedia_search import extract_wikipedia_content
+                from search.wikipedia_search import extract_wikipedia_content
                 return extract_wikipedia_content(url, timeout, headers)
             except ImportError:
                 print("Módulo wikipedia_search não disponível, usando extração genérica")
             
         # Para outros sites, tenta newspaper3k primeiro
         if NEWSPAPER_AVAILABLE:
-            try:
-                article = Article(url)
-                article.download()
-                article.parse()
-                
-                if article.text and len(article.text) > 500:
-                    return {
-                        "title": article.title or url,
-                        "url": url,
-                        "content": article.text,
-                        "error": False
-                    }
-            except Exception as e:
-                print(f"Falha ao extrair com newspaper3k: {str(e)}. Tentando método alternativo.")
-
-        response = requests.get(url, timeout=timeout, headers=headers)
+            content_data = _extract_with_newspaper(url, timeout)
+            if content_data:
+                return content_data
+
+        # Sessão compartilhada: reaproveita conexões já abertas com o mesmo host
+        response = SESSION.get(url, timeout=timeout, stream=True)
 
         if response.status_code != 200:
+            response.close()
             return {
                 "title": url,
                 "url": url,
@@ -105,56 +194,24 @@ def extract_web_content(url: str, timeout: int = 10) -> Dict[str, str]:
                 "error": True
             }
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove todos os elementos não textuais
-        for element in soup.find_all(['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe', 'form', 'button', 'meta', 'link', 'noscript']):
-            element.decompose()
-        
-        # Extração do título
-        title = url
-        title_tag = soup.find('title')
-        if title_tag:
-            title = title_tag.get_text().strip()
-        
-        main_content = ""
-        
-        # Seletores para identificar o conteúdo principal
-        content_selectors = [
-            'article', 'main', 'div[role="main"]', 
-            'div[class*="content"]', 'div[id*="content"]',
-            'div[class*="article"]', 'div[id*="article"]',
-            'div[class*="post"]', 'div[id*="post"]',
-            'div[class*="body"]', 'div[id*="body"]',
-            'section[class*="content"]', 'section[id*="content"]'
-        ]
-        
-        main_elements = []
-        for selector in content_selectors:
-            elements = soup.select(selector)
-            if elements:
-                main_elements.extend(elements)
-        
-        if main_elements:
-            substantial_elements = [elem for elem in main_elements if len(elem.get_text(strip=True)) > 100]
-            if substantial_elements:
-                main_content = max([elem.get_text(separator=' ', strip=True) for elem in substantial_elements], key=len)
-        
-        # Tenta extrair de parágrafos se o conteúdo principal não foi encontrado
-        if len(main_content) < 1000:
-            paragraphs = soup.find_all('p')
-            substantial_paragraphs = [p.get_text(strip=True) for p in paragraphs if len(p.get_text(strip=True)) > 20]
-            if substantial_paragraphs:
-                main_content = ' '.join(substantial_paragraphs)
-        
-        # Último recurso: extrai todo o texto do corpo
-        if len(main_content) < 1000:
-            body = soup.find('body')
-            if body:
-                main_content = body.get_text(separator=' ', strip=True)
+        # O cabeçalho chega antes do corpo: descarta não-HTML sem baixar nada
+        content_type = response.headers.get('content-type', '').lower()
+        if content_type and not content_type.startswith(HTML_CONTENT_TYPES):
+            response.close()
+            return {
+                "title": url,
+                "url": url,
+                "content": f"Conteúdo ignorado: tipo não suportado ({content_type.split(';')[0]})",
+                "error": True
+            }
+
+        html = read_limited(response, MAX_HTML_BYTES)
+        encoding = declared_encoding(response)
+        # Parsing (CPU) em processo separado, fora do GIL das threads de extração
+        title, main_content = parse_html_in_pool(html, url, encoding)
         
-        # Limpa espaços extras
-        main_content = re.sub(r'\s+', ' ', main_content).strip()
+        # Limpa espaços extras (split sem argumentos já descarta sequências de espaços)
+        main_content = ' '.join(main_content.split())
           
         # Limita o tamanho do conteúdo para processamento
         max_content_length = 20000  
@@ -0,0 +1,201 @@
+#html_parser.py
+from typing import Callable, Optional, Tuple, TypeVar
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+import multiprocessing
+import os
+import re
+from bs4 import BeautifulSoup, SoupStrainer, UnicodeDammit
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+    print("Biblioteca lxml não encontrada. Para parsing HTML mais rápido, instale com: pip install lxml")
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+    print("Biblioteca selectolax não encontrada. Para extração de conteúdo mais rápida, instale com: pip install selectolax")
+
+# Só <title> e <body> são usados na extração; o restante do <head>
+# (scripts, estilos, metadados) nem chega a ser materializado
+PAGE_STRAINER = SoupStrainer(['title', 'body'])
+
+# Elementos sem texto útil, removidos antes da extração
+NOISE_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe', 'form', 'button', 'meta', 'link', 'noscript']
+
+# Classes/ids que indicam o bloco de conteúdo principal de uma página
+CONTENT_ATTR_WORDS = ('content', 'article', 'post', 'body')
+CONTENT_ATTR_RE = re.compile('|'.join(CONTENT_ATTR_WORDS))
+
+# Seletores do bloco principal em ordem de prioridade: (tags, atributos)
+CONTENT_SELECTORS = [
+    (['article', 'main'], {}),
+    ('div', {'role': 'main'}),
+    (['div', 'section'], {'class': CONTENT_ATTR_RE}),
+    (['div', 'section'], {'id': CONTENT_ATTR_RE}),
+]
+
+# Os mesmos seletores em CSS, para o parser selectolax
+CONTENT_CSS_SELECTORS = [
+    'article, main',
+    'div[role="main"]',
+    ', '.join(f'{tag}[class*="{word}"]' for tag in ('div', 'section') for word in CONTENT_ATTR_WORDS),
+    ', '.join(f'{tag}[id*="{word}"]' for tag in ('div', 'section') for word in CONTENT_ATTR_WORDS),
+]
+
+# Processos para o parsing de HTML (CPU): as threads de extração só esperam o resultado.
+# "spawn" evita herdar locks de outras threads, como aconteceria com fork. O parsing é uma
+# parte pequena de cada extração (o resto é rede), então poucos processos bastam
+PARSE_WORKERS = min(4, os.cpu_count() or 1)
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = Lock()
+
+# Os processos do pool reexecutam o __main__ do processo pai. Enquanto não se sabe se ele é
+# leve (o launcher do servidor ou o uvicorn), o parsing fica na thread de extração
+_parse_pool_enabled = False
+
+T = TypeVar('T')
+
+def parse_html(html: bytes, url: str, encoding: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Extrai título e conteúdo principal do HTML.
+    Usa selectolax (Lexbor) quando disponível e BeautifulSoup como alternativa.
+    
+    Returns:
+        Tupla (título, texto principal)
+    """
+    if SELECTOLAX_AVAILABLE:
+        try:
+            return _parse_with_selectolax(html, url, encoding)
+        except Exception as e:
+            print(f"Falha ao extrair com selectolax: {str(e)}. Tentando BeautifulSoup.")
+    return _parse_with_bs4(html, url, encoding)
+
+def _parse_with_selectolax(html: bytes, url: str, encoding: Optional[str]) -> Tuple[str, str]:
+    """Extração somente leitura com o parser Lexbor do selectolax"""
+    # Detecta o charset (cabeçalho, <meta> ou heurística) antes de entregar o texto ao Lexbor
+    markup = UnicodeDammit(html, [encoding] if encoding else []).unicode_markup or ''
+    tree = LexborHTMLParser(markup)
+    tree.strip_tags(NOISE_TAGS)
+    
+    title = url
+    title_node = tree.css_first('title')
+    if title_node:
+        title = title_node.text(strip=True) or url
+    
+    main_content = ""
+    for selector in CONTENT_CSS_SELECTORS:
+        for node in tree.css(selector):
+            text = node.text(separator=' ', strip=True)
+            if len(text) > 100 and len(text) > len(main_content):
+                main_content = text
+        if len(main_content) >= 1000:
+            break
+    
+    if len(main_content) < 1000:
+        substantial_paragraphs = [text for text in (p.text(strip=True) for p in tree.css('p')) if len(text) > 20]
+        if substantial_paragraphs:
+            main_content = ' '.join(substantial_paragraphs)
+    
+    if len(main_content) < 1000 and tree.body is not None:
+        main_content = tree.body.text(separator=' ', strip=True)
+    
+    return title, main_content
+
+def _parse_with_bs4(html: bytes, url: str, encoding: Optional[str]) -> Tuple[str, str]:
+    """Extração com BeautifulSoup"""
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=PAGE_STRAINER, from_encoding=encoding)
+    
+    # Remove todos os elementos não textuais
+    for element in soup.find_all(NOISE_TAGS):
+        element.decompose()
+    
+    # Extração do título
+    title = url
+    title_tag = soup.find('title')
+    if title_tag:
+        title = title_tag.get_text().strip()
+    
+    main_content = ""
+    
+    # Elementos que costumam conter o conteúdo principal, do seletor mais confiável
+    # ao mais genérico; para no primeiro grupo que já rende conteúdo suficiente
+    for name, attrs in CONTENT_SELECTORS:
+        for elem in soup.find_all(name, attrs=attrs):
+            text = elem.get_text(separator=' ', strip=True)
+            if len(text) > 100 and len(text) > len(main_content):
+                main_content = text
+        if len(main_content) >= 1000:
+            break
+    
+    # Tenta extrair de parágrafos se o conteúdo principal não foi encontrado
+    if len(main_content) < 1000:
+        paragraphs = soup.find_all('p')
+        substantial_paragraphs = [p.get_text(strip=True) for p in paragraphs if len(p.get_text(strip=True)) > 20]
+        if substantial_paragraphs:
+            main_content = ' '.join(substantial_paragraphs)
+    
+    # Último recurso: extrai todo o texto do corpo
+    if len(main_content) < 1000:
+        body = soup.find('body')
+        if body:
+            main_content = body.get_text(separator=' ', strip=True)
+    
+    return title, main_content
+
+def enable_parse_pool():
+    """Libera o pool de processos; chamado pelo servidor ao subir, quando o __main__ não é a aplicação"""
+    global _parse_pool_enabled
+    _parse_pool_enabled = True
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    """Cria (uma única vez) o pool de processos de parsing"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _parse_pool
+
+def _reset_parse_pool(pool: ProcessPoolExecutor):
+    """Descarta um pool quebrado, para que a próxima chamada crie outro"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is pool:
+            _parse_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def run_in_parse_pool(fn: Callable[..., T], *args) -> T:
+    """
+    Executa fn(*args) no pool de processos e aguarda o resultado (chamada bloqueante,
+    feita das threads de extração). fn precisa ser uma função de módulo, para ser
+    enviada ao processo. Se o pool não foi liberado (enable_parse_pool) ou estiver
+    indisponível, executa aqui mesmo.
+    """
+    if not _parse_pool_enabled:
+        return fn(*args)
+    
+    try:
+        pool = _get_parse_pool()
+    except (OSError, NotImplementedError) as e:
+        print(f"Pool de parsing indisponível: {str(e)}. Fazendo parsing na thread atual.")
+        return fn(*args)
+    
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        print("Pool de parsing interrompido. Fazendo parsing na thread atual.")
+        _reset_parse_pool(pool)
+        return fn(*args)
+
+def parse_html_in_pool(html: bytes, url: str, encoding: Optional[str] = None) -> Tuple[str, str]:
+    """Executa parse_html no pool de processos (ver run_in_parse_pool)"""
+    return run_in_parse_pool(parse_html, html, url, encoding)
@@ -0,0 +1,77 @@
+#http_client.py
+from typing import Optional
+import asyncio
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Tamanho do pool de conexões por host; acompanha o número de extrações simultâneas
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 64
+
+# Novas tentativas rápidas para falhas transitórias de conexão
+MAX_RETRIES = Retry(total=2, backoff_factor=0.2)
+
+# Tamanho dos blocos lidos de respostas em streaming
+READ_CHUNK_SIZE = 65536
+
+def _create_session() -> requests.Session:
+    """Cria a sessão HTTP compartilhada, com pool de conexões keep-alive"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=MAX_RETRIES,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT})
+    return session
+
+# Sessão única do processo: reaproveita conexões TCP/TLS entre as extrações
+SESSION = _create_session()
+
+def declared_encoding(response: requests.Response) -> Optional[str]:
+    """Charset declarado no Content-Type; None deixa o parser detectar pelo <meta>"""
+    if 'charset=' in response.headers.get('content-type', '').lower():
+        return response.encoding
+    return None
+
+def read_limited(response: requests.Response, limit: int) -> bytes:
+    """Lê o corpo de uma resposta em streaming, parando ao atingir o limite de bytes"""
+    chunks = []
+    size = 0
+    try:
+        for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= limit:
+                break
+    finally:
+        response.close()
+    return b"".join(chunks)
+
+class RateLimiter:
+    """Token bucket assíncrono: até `rate` requisições por segundo, com rajadas de até `burst`"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Aguarda até haver uma ficha disponível e a consome"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
@@ -1,10 +1,38 @@
 #wikipedia_search.py
-from typing import Dict, List
-import requests
-from bs4 import BeautifulSoup
+from typing import Dict, List, Optional
+from bs4 import BeautifulSoup, SoupStrainer
 import re
 import urllib.parse
 from langchain_core.tools import tool
+from search.cache import TTLCache, normalize_query
+from search.http_client import SESSION, declared_encoding, read_limited
+from search.html_parser import HTML_PARSER, run_in_parse_pool
+
+# Padrões compilados uma única vez no carregamento do módulo
+SECTION_MARK_RE = re.compile(r'\[\w+\]')   # Marcas como [editar] nos títulos
+CITATION_RE = re.compile(r'\[\d+\]')       # Referências numéricas
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Só o título e o corpo do artigo são materializados; menus, cabeçalho
+# e rodapé da página ficam fora da árvore
+ARTICLE_STRAINER = SoupStrainer(id=['firstHeading', 'mw-content-text'])
+
+# Elementos sem texto útil e blocos de navegação/tabelas, removidos numa única passada
+NOISE_SELECTOR = 'script, style, footer, header, aside, iframe, nav, .navbox, .vertical-navbox, .infobox, .sidebar, table'
+
+# Títulos de seção e blocos de texto percorridos na extração
+HEADING_TAGS = ('h2', 'h3', 'h4')
+BLOCK_TAGS = ['p', 'ul', *HEADING_TAGS]
+
+# Seções finais sem conteúdo do artigo
+SKIPPED_SECTIONS_RE = re.compile('Referências|Ver também|Bibliografia')
+
+# Limite de HTML lido por artigo; a marcação da Wikipedia é densa, mas 1,5 MB já
+# rendem bem mais que os 20000 caracteres de texto mantidos
+MAX_HTML_BYTES = 1_500_000
+
+# Resultados de busca ficam em cache por 1 hora
+SEARCH_CACHE = TTLCache(maxsize=512, ttl=3600)
 
 @tool
 def wikipedia_search_tool(query: str) -> List[Dict]:
@@ -20,7 +48,7 @@ def wikipedia_search_tool(query: str) -> List[Dict]:
             "srlimit": 1
         }
         
-        search_response = requests.get(search_url, params=search_params, timeout=10)
+        search_response = SESSION.get(search_url, params=search_params, timeout=10)
         
         if search_response.status_code != 200:
             return [{"error": f"Erro na busca Wikipedia: Status {search_response.status_code}", "source_type": "wikipedia"}]
@@ -48,15 +76,23 @@ def wikipedia_search_tool(query: str) -> List[Dict]:
         return [{"error": f"Erro na busca Wikipedia: {str(e)}", "source_type": "wikipedia"}]
 
 def execute_wikipedia_search(query: str, num_results: int = 5) -> List[Dict]:
-    """Função helper para executar busca na Wikipedia"""
-    return wikipedia_search_tool.invoke({"query": query})
+    """Função helper para executar busca na Wikipedia (com cache por query)"""
+    cache_key = (normalize_query(query), num_results)
+    results = SEARCH_CACHE.get(cache_key)
+    if results is None:
+        results = wikipedia_search_tool.invoke({"query": query})
+        # Não guarda falhas, para que a próxima chamada tente novamente
+        if not any(r.get("error") for r in results):
+            SEARCH_CACHE.set(cache_key, results)
+    return results
 
 def extract_wikipedia_content(url: str, timeout: int, headers: Dict) -> Dict[str, str]:
     """Extrai conteúdo específico de páginas da Wikipedia"""
     try:
-        response = requests.get(url, timeout=timeout, headers=headers)
+        response = SESSION.get(url, timeout=timeout, headers=headers, stream=True)
         
         if response.status_code != 200:
+            response.close()
             return {
                 "title": url,
                 "url": url,
@@ -64,81 +100,9 @@ def extract_wikipedia_content(url: str, timeout: int, headers: Dict) -> Dict[str
                 "error": True
             }
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove elementos indesejados
-        for element in soup.find_all(['script', 'style', 'footer', 'header', 'aside', 'iframe', 'nav']):
-            element.decompose()
-        
-        # Extrai título
-        title = "Artigo Wikipedia"
-        title_elem = soup.select_one('#firstHeading')
-        if title_elem:
-            title = title_elem.get_text().strip()
-        
-        # Extrai conteúdo do artigo
-        content = ""
-        article = soup.select_one('#mw-content-text')
-        if article:
-            # Remove elementos de navegação, tabelas e outros elementos não relevantes
-            for element in article.select('.navbox, .vertical-navbox, .infobox, .sidebar, table'):
-                element.decompose()
-            
-            # Obtém todos os parágrafos e seções de conteúdo
-            paragraphs = []
-            
-            # Adiciona parágrafos iniciais (antes do sumário)
-            intro_content = ""
-            for p in article.select('p'):
-                if p.parent.get('id') != 'toc' and not p.select('.mw-empty-elt'):
-                    intro_text = p.get_text().strip()
-                    if intro_text:
-                        paragraphs.append(intro_text)
-            
-            # Adiciona seções com seus títulos
-            for section in article.select('h2, h3, h4'):
-                section_title = section.get_text().strip()
-                if 'Referências' in section_title or 'Ver também' in section_title or 'Bibliografia' in section_title:
-                    continue
-                
-                # Remove numeração e editar
-                section_title = re.sub(r'\[\w+\]', '', section_title).strip()
-                
-                if section_title:
-                    paragraphs.append(f"\n## {section_title}\n")
-                
-                # Adiciona parágrafos desta seção
-                next_node = section.next_sibling
-                while next_node and next_node.name not in ['h2', 'h3', 'h4']:
-                    if next_node.name == 'p':
-                        para_text = next_node.get_text().strip()
-                        if para_text:
-                            paragraphs.append(para_text)
-                    elif next_node.name == 'ul':
-                        for li in next_node.select('li'):
-                            li_text = li.get_text().strip()
-                            if li_text:
-                                paragraphs.append(f"- {li_text}")
-                    
-                    next_node = next_node.next_sibling
-            
-            content = "\n\n".join(paragraphs)
-        
-        # Limpa o conteúdo
-        content = re.sub(r'\[\d+\]', '', content)  # Remove referências numéricas
-        content = re.sub(r'\s+', ' ', content)     # Normaliza espaços
-        
-        # Limita tamanho
-        max_content_length = 20000
-        if len(content) > max_content_length:
-            content = content[:max_content_length] + "... [conteúdo truncado]"
-        
-        return {
-            "title": title,
-            "url": url,
-            "content": content,
-            "error": False
-        }
+        html = read_limited(response, MAX_HTML_BYTES)
+        # Parsing (CPU) no pool de processos, fora do GIL das threads de extração
+        return run_in_parse_pool(parse_wikipedia_page, html, url, declared_encoding(response))
         
     except Exception as e:
         return {
@@ -146,4 +110,73 @@ def extract_wikipedia_content(url: str, timeout: int, headers: Dict) -> Dict[str
             "url": url,
             "content": f"Erro ao processar página Wikipedia: {str(e)}",
             "error": True
-        }
\ No newline at end of file
+        }
+
+def parse_wikipedia_page(html: bytes, url: str, encoding: Optional[str] = None) -> Dict[str, str]:
+    """Extrai título e texto do artigo (introdução e seções) do HTML de uma página da Wikipedia"""
+    soup = BeautifulSoup(
+        html, HTML_PARSER,
+        parse_only=ARTICLE_STRAINER, from_encoding=encoding
+    )
+
+    # Remove elementos indesejados
+    for element in soup.select(NOISE_SELECTOR):
+        element.decompose()
+
+    # Extrai título
+    title = "Artigo Wikipedia"
+    title_elem = soup.select_one('#firstHeading')
+    if title_elem:
+        title = title_elem.get_text().strip()
+
+    # Extrai conteúdo do artigo
+    content = ""
+    article = soup.select_one('#mw-content-text')
+    if article:
+        # Um único percurso em ordem de documento: cada título abre uma seção,
+        # e os parágrafos e listas seguintes pertencem a ela (os anteriores ao
+        # primeiro título formam a introdução)
+        paragraphs = []
+        skipping = False
+        for node in article.find_all(BLOCK_TAGS):
+            if node.name in HEADING_TAGS:
+                section_title = node.get_text().strip()
+                skipping = bool(SKIPPED_SECTIONS_RE.search(section_title))
+                if skipping:
+                    continue
+
+                # Remove numeração e editar
+                section_title = SECTION_MARK_RE.sub('', section_title).strip()
+                if section_title:
+                    paragraphs.append(f"\n## {section_title}\n")
+            elif skipping:
+                continue
+            elif node.name == 'p':
+                if node.parent.get('id') != 'toc':
+                    para_text = node.get_text().strip()
+                    if para_text:
+                        paragraphs.append(para_text)
+            elif node.find_parent('li') is None:
+                # Listas aninhadas já entram no texto do item que as contém
+                for li in node.find_all('li', recursive=False):
+                    li_text = li.get_text().strip()
+                    if li_text:
+                        paragraphs.append(f"- {li_text}")
+
+        content = "\n\n".join(paragraphs)
+
+    # Limpa o conteúdo
+    content = CITATION_RE.sub('', content)  # Remove referências numéricas
+    content = WHITESPACE_RE.sub(' ', content)     # Normaliza espaços
+
+    # Limita tamanho
+    max_content_length = 20000
+    if len(content) > max_content_length:
+        content = content[:max_content_length] + "... [conteúdo truncado]"
+
+    return {
+        "title": title,
+        "url": url,
+        "content": content,
+        "error": False
+    }
@@ -0,0 +1,18 @@
+#server.py
+import uvicorn
+
+# Ponto de entrada do backend. Fica separado de main.py porque os processos do pool
+# de parsing (spawn) reexecutam o módulo __main__ do processo pai: este arquivo só
+# importa a aplicação dentro do bloco abaixo, que não roda nos processos filhos,
+# então eles carregam apenas o módulo de parsing.
+if __name__ == "__main__":
+    from main import app, EVENT_LOOP, HTTP_IMPL
+
+    uvicorn.run(
+        app, 
+        host="0.0.0.0", 
+        port=8000,
+        log_level="info",
+        loop=EVENT_LOOP,
+        http=HTTP_IMPL
+    )
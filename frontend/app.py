@@ -1,13 +1,58 @@
 # app.py
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import httpx
+import asyncio
 import json
 import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 import uuid
-from threading import Thread
-import queue
+from threading import Lock, Thread
+from concurrent.futures import Future
+from collections import deque
+from itertools import islice
+import re
+from pathlib import Path
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Tempo máximo de um stream SSE (mesmo limite do backend)
+SSE_TIMEOUT = 1800
+
+# Eventos guardados por sessão e quantos dos mais recentes aparecem no painel de progresso
+MAX_EVENTS_KEPT = 200
+MAX_EVENTS_SHOWN = 50
+
+# Eventos pendentes a partir dos quais os de andamento deixam de ser enfileirados
+MAX_PENDING_EVENTS = 500
+DROPPABLE_EVENT_TYPES = frozenset({'search', 'analyze'})
+
+# Pool de conexões keep-alive para as chamadas REST ao backend
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 16
+
+# Intervalo, em segundos, entre as atualizações do painel de progresso durante a pesquisa
+REFRESH_INTERVAL = 0.75
+
+# Validade, em segundos, da última verificação do backend, compartilhada por todas as sessões
+BACKEND_CHECK_TTL = 30
+
+# Folha de estilos da interface e padrões usados na minificação
+CSS_PATH = Path(__file__).parent / "static" / "styles.css"
+CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_SPACE_RE = re.compile(r"\s*([{}:;,>])\s*")
+
+# Quadro SSE completo: "event:" + "data:" (JSON em uma linha) ou comentário de heartbeat
+SSE_FRAME_RE = re.compile(
+    rb"^(?:event:[ \t]*(\S+)\r?\ndata:[ \t]*([^\r\n]*)|:[^\r\n]*)\r?\n\r?\n", re.MULTILINE
+)
 
 st.set_page_config(
     page_title="Deep Research Service",
@@ -15,85 +60,26 @@ st.set_page_config(
     layout="wide"
 )
 
-st.markdown("""
-<style>
-    .main-header {
-        text-align: center;
-        padding: 5px 0;
-        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border-radius: 10px;
-        margin-bottom: 30px;
-    }
-    .research-container {
-        border: 2px solid #e0e0e0;
-        border-radius: 12px;
-        padding: 24px;
-        margin: 16px 0;
-        background-color: rgba(227, 242, 253, 0.07);
-    }
-    /* Customização do st.status */
-    div[data-testid="stStatusContainer"] {
-        background-color: rgba(255, 255, 255, 0.05);
-    }
-    div[data-testid="stStatusContainer"] > div {
-        padding: 10px;
-    }
-    /* Garante que o texto do relatório seja exibido corretamente */
-    .report-content {
-        white-space: pre-wrap !important;
-        line-height: 1.6 !important;
-        overflow-wrap: break-word !important;
-        word-wrap: break-word !important;
-    }
-    /* Status de andamento da pesquisa */
-    .status-badge {
-        display: inline-block;
-        padding: 5px 10px;
-        border-radius: 15px;
-        font-weight: bold;
-        margin-bottom: 10px;
-    }
-    .status-running {
-        background-color: #4CAF50;
-        color: white;
-    }
-    .status-error {
-        background-color: #F44336;
-        color: white;
-    }
-    .status-warning {
-        background-color: #FF9800;
-        color: white;
-    }
-    .status-complete {
-        background-color: #2196F3;
-        color: white;
-    }
-    /* Estilos para mensagens de timeout */
-    .timeout-message {
-        background-color: #FFF3E0;
-        border-left: 5px solid #FF9800;
-        padding: 10px;
-        margin: 10px 0;
-        border-radius: 4px;
-    }
-    /* Animação de carregamento para status em andamento */
-    @keyframes pulse {
-      0% { opacity: 0.6; }
-      50% { opacity: 1; }
-      100% { opacity: 0.6; }
-    }
-    .pulse {
-      animation: pulse 2s infinite ease-in-out;
-    }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def load_css() -> str:
+    """Lê e minifica a folha de estilos uma única vez por processo (reaproveitada em todos os reruns)"""
+    css = CSS_PATH.read_text(encoding="utf-8")
+    css = CSS_COMMENT_RE.sub("", css)
+    css = CSS_SPACE_RE.sub(r"\1", " ".join(css.split()))
+    return f"<style>{css}</style>"
+
+# O Streamlit só mantém na página o que cada rerun emite, então o estilo é reenviado
+# sempre; o custo de leitura e minificação fica no cache
+st.markdown(load_css(), unsafe_allow_html=True)
 
 def initialize_session_state():
     """Inicializa variáveis de sessão"""
     if 'final_report' not in st.session_state:
         st.session_state.final_report = ""
+    if 'final_report_download' not in st.session_state:
+        st.session_state.final_report_download = (b"", "")
+    if 'partial_report' not in st.session_state:
+        st.session_state.partial_report = ""
     if 'is_researching' not in st.session_state:
         st.session_state.is_researching = False
     if 'research_progress' not in st.session_state:
@@ -103,45 +89,107 @@ def initialize_session_state():
     if 'research_id' not in st.session_state:
         st.session_state.research_id = None
     if 'event_queue' not in st.session_state:
-        st.session_state.event_queue = queue.Queue()
-    if 'sse_thread' not in st.session_state:
-        st.session_state.sse_thread = None
+        st.session_state.event_queue = EventBuffer()
+    if 'sse_future' not in st.session_state:
+        st.session_state.sse_future = None
     if 'real_time_events' not in st.session_state:
-        st.session_state.real_time_events = []
-    if 'backend_check_time' not in st.session_state:
-        st.session_state.backend_check_time = 0
-    if 'backend_status' not in st.session_state:
-        st.session_state.backend_status = None
-    if 'last_status_update' not in st.session_state:
-        st.session_state.last_status_update = ""
+        st.session_state.real_time_events = deque(maxlen=MAX_EVENTS_KEPT)
     if 'research_start_time' not in st.session_state:
         st.session_state.research_start_time = None
     if 'max_research_time' not in st.session_state:
         st.session_state.max_research_time = 1800  # 30 minutos em segundos
     if 'research_status' not in st.session_state:
         st.session_state.research_status = "not_started"
-    if 'last_check_time' not in st.session_state:
-        st.session_state.last_check_time = 0
+
+# Classe CSS da caixa de status de cada tipo de evento
+STATUS_BOX_CLASSES = {
+    'error': 'error-box',
+    'complete': 'status-box',
+    'plan': 'plan-box',
+    'search': 'search-box',
+    'search_complete': 'search-box',
+    'analyze': 'analyze-box',
+    'analyze_complete': 'analyze-box',
+    'report': 'report-box',
+    'report_complete': 'report-box',
+    'start': 'info-box',
+    'pipeline_start': 'info-box',
+    'decision': 'plan-box',
+    'timeout': 'error-box',
+    'cancelled': 'error-box'
+}
+
+# Ícone de cada tipo de evento no painel de progresso
+EVENT_ICONS = {
+    'start': '🚀',
+    'plan': '📋',
+    'search': '🔍',
+    'search_complete': '✅',
+    'analyze': '🔬',
+    'analyze_complete': '📊',
+    'report': '📝',
+    'report_complete': '📄',
+    'complete': '🎉',
+    'error': '❌',
+    'timeout': '⏱️',
+    'cancelled': '🛑',
+    'pipeline_start': '⚙️',
+    'decision': '🤔',
+    'connected': '🔗',
+    'disconnected': '🔌'
+}
+
+# Emoji da mensagem de status para os tipos sem formatação própria
+STATUS_EMOJIS = {
+    'pipeline_start': '⚙️',
+    'connected': '🔗',
+    'disconnected': '🔌'
+}
+
+def truncate(text: str, limit: int = 50) -> str:
+    """Corta o texto em `limit` caracteres, indicando o corte com reticências"""
+    return f"{text[:limit]}..." if len(text) > limit else text
 
 def get_status_box_class(event_type: str) -> str:
     """Retorna a classe CSS apropriada para o tipo de evento"""
-    mapping = {
-        'error': 'error-box',
-        'complete': 'status-box',
-        'plan': 'plan-box',
-        'search': 'search-box',
-        'search_complete': 'search-box',
-        'analyze': 'analyze-box',
-        'analyze_complete': 'analyze-box',
-        'report': 'report-box',
-        'report_complete': 'report-box',
-        'start': 'info-box',
-        'pipeline_start': 'info-box',
-        'decision': 'plan-box',
-        'timeout': 'error-box',
-        'cancelled': 'error-box'
-    }
-    return mapping.get(event_type, 'info-box')
+    return STATUS_BOX_CLASSES.get(event_type, 'info-box')
+
+def _status_plan(message: str, details: dict) -> Optional[str]:
+    if 'query' in details:
+        return f"📋 Planejando: {truncate(details['query'])}"
+
+def _status_search(message: str, details: dict) -> Optional[str]:
+    if 'query' in details:
+        return f"🔍 Buscando: {truncate(details['query'])}"
+
+def _status_analyze(message: str, details: dict) -> Optional[str]:
+    titles = details.get('titles')
+    if titles:
+        return f"🔬 Analisando: {truncate(', '.join(titles[:2]))}"
+
+def _status_report(message: str, details: dict) -> str:
+    total = details.get('total_results', 0)
+    if total > 0:
+        return f"📝 Gerando relatório ({total} resultados)"
+    return "📝 Gerando relatório"
+
+# Formatadores da mensagem de status por tipo de evento: recebem (message, details) e
+# devolvem o texto, ou None para cair na formatação genérica
+STATUS_FORMATTERS: Dict[str, Callable[[str, dict], Optional[str]]] = {
+    'start': lambda message, details: "🚀 Iniciando pesquisa",
+    'plan': _status_plan,
+    'search': _status_search,
+    'search_complete': lambda message, details: "✅ Busca concluída",
+    'analyze': _status_analyze,
+    'analyze_complete': lambda message, details: f"📊 Análise concluída - Iteração {details.get('iteration', 0)}",
+    'report': _status_report,
+    'report_complete': lambda message, details: "📄 Relatório completo",
+    'complete': lambda message, details: "🎉 Pesquisa concluída!",
+    'error': lambda message, details: f"❌ Erro: {message}",
+    'timeout': lambda message, details: f"⏱️ Timeout: {message}",
+    'cancelled': lambda message, details: f"🛑 Pesquisa cancelada: {message}",
+    'decision': lambda message, details: f"🤔 {message}"
+}
 
 def format_status_message(event: dict) -> str:
     """Formata mensagem do evento para o status"""
@@ -150,93 +198,161 @@ def format_status_message(event: dict) -> str:
     message = data.get('message', '')
     details = data.get('details', {})
     
-    if event_type == 'start':
-        return f"🚀 Iniciando pesquisa"
-    elif event_type == 'plan' and 'query' in details:
-        return f"📋 Planejando: {details['query'][:50]}..." if len(details['query']) > 50 else f"📋 Planejando: {details['query']}"
-    elif event_type == 'search' and 'query' in details:
-        return f"🔍 Buscando: {details['query'][:50]}..." if len(details['query']) > 50 else f"🔍 Buscando: {details['query']}"
-    elif event_type == 'search_complete':
-        count = details.get('count', 0)
-        return f"✅ Busca concluída"
-    elif event_type == 'analyze' and 'titles' in details and details['titles']:
-        titles = details['titles'][:2]
-        if titles:
-            return f"🔬 Analisando: {', '.join(titles)[:50]}..." if len(', '.join(titles)) > 50 else f"🔬 Analisando: {', '.join(titles)}"
-        return f"🔬 Analisando resultados"
-    elif event_type == 'analyze_complete':
-        iteration = details.get('iteration', 0)
-        return f"📊 Análise concluída - Iteração {iteration}"
-    elif event_type == 'report':
-        total = details.get('total_results', 0)
-        if total > 0:
-            return f"📝 Gerando relatório ({total} resultados)"
-        return f"📝 Gerando relatório"
-    elif event_type == 'report_complete':
-        return f"📄 Relatório completo"
-    elif event_type == 'complete':
-        return f"🎉 Pesquisa concluída!"
-    elif event_type == 'error':
-        return f"❌ Erro: {message}"
-    elif event_type == 'timeout':
-        return f"⏱️ Timeout: {message}"
-    elif event_type == 'cancelled':
-        return f"🛑 Pesquisa cancelada: {message}"
-    elif event_type == 'decision':
-        return f"🤔 {message}"
-    elif message:
-        emojis = {
-            'pipeline_start': '⚙️',
-            'connected': '🔗',
-            'disconnected': '🔌',
-            'check_result': '🔄'
-        }
-        emoji = emojis.get(event_type, '⚙️')
-        return f"{emoji} {message}"
-    else:
-        return "🔄 Processando..."
+    formatter = STATUS_FORMATTERS.get(event_type)
+    if formatter is not None:
+        status_message = formatter(message, details)
+        if status_message is not None:
+            return status_message
+    
+    if message:
+        return f"{STATUS_EMOJIS.get(event_type, '⚙️')} {message}"
+    return "🔄 Processando..."
+
+# Texto de cada tipo de evento no painel de progresso; o ícone é prefixado na importação
+EVENT_TEMPLATE_TEXTS = {
+    'search': "**Buscando:** {query}",
+    'plan': "**Nova query planejada:** {query}",
+    'analyze': "**Analisando resultados**",
+    'search_complete': "**Busca concluída**",
+    'analyze_complete': "**Análise concluída** - Iteração {iteration}",
+    'report': "**Gerando relatório final**",
+    'complete': "**Pesquisa concluída com sucesso!**",
+    'error': "**Erro:** {message}",
+    'timeout': "**Timeout:** {message}",
+    'cancelled': "**Cancelado:** {message}"
+}
+
+# Métodos format_map já ligados a cada modelo: renderizar um evento é uma busca no dict + uma formatação
+EVENT_TEMPLATES: Dict[str, Callable[[dict], str]] = {
+    event_type: f"{EVENT_ICONS[event_type]} {text}".format_map
+    for event_type, text in EVENT_TEMPLATE_TEXTS.items()
+}
+EVENT_TEMPLATES['report_total'] = f"{EVENT_ICONS['report']} **Gerando relatório final** ({{total_results}} resultados processados)".format_map
 
-def format_event_message(event: dict) -> str:
-    """Formata mensagem do evento para exibição"""
+# Detalhe sem o qual o evento cai na linha genérica "ícone + mensagem"
+EVENT_TEMPLATE_REQUIRES = {
+    'search': 'query',
+    'plan': 'query',
+    'analyze': 'titles'
+}
+
+EVENT_TEMPLATE_DEFAULTS = {'iteration': 0}
+
+ANALYZED_TITLE_LINE = "   📄 {}".format
+INSIGHTS_PREVIEW_LINE = "💡 **Preview:** {}...".format
+WORD_COUNT_LINE = "📊 Relatório gerado com {} palavras".format
+
+def render_event_lines(event: dict) -> list:
+    """Linhas exibidas no painel de progresso para um evento"""
     event_type = event.get('type', '')
     data = event.get('data', {})
     message = data.get('message', '')
-    timestamp = data.get('timestamp', '')
     details = data.get('details', {})
+
+    if event_type == 'report' and details.get('total_results', 0) > 0:
+        template = EVENT_TEMPLATES['report_total']
+    else:
+        template = EVENT_TEMPLATES.get(event_type)
+
+    required = EVENT_TEMPLATE_REQUIRES.get(event_type)
+    if template is None or (required is not None and required not in details):
+        return [f"{EVENT_ICONS.get(event_type, '📌')} {message}"]
+
+    lines = [template({**EVENT_TEMPLATE_DEFAULTS, **details, 'message': message})]
+
+    if event_type == 'analyze':
+        lines.extend(map(ANALYZED_TITLE_LINE, details['titles'][:2]))
+    elif event_type == 'analyze_complete' and 'insights_preview' in details:
+        lines.append(INSIGHTS_PREVIEW_LINE(details['insights_preview'][:150]))
+    elif event_type == 'report_complete' and 'word_count' in details:
+        lines.append(WORD_COUNT_LINE(details['word_count']))
+    return lines
+
+class EventBuffer:
+    """
+    Eventos recebidos pelo consumidor SSE e ainda não processados pela interface.
+    Um deque protegido por um único lock: cada rerun leva todos os pendentes de uma vez
+    """
+    
+    def __init__(self):
+        self._events = deque()
+        self._lock = Lock()
+    
+    def put(self, event: dict):
+        with self._lock:
+            self._events.append(event)
+    
+    def extend(self, events: list):
+        with self._lock:
+            pending = self._events
+            for event in events:
+                # Acima do limite, eventos de andamento são descartados; finais e trechos do relatório nunca
+                if len(pending) >= MAX_PENDING_EVENTS and event.get('type') in DROPPABLE_EVENT_TYPES:
+                    continue
+                pending.append(event)
+    
+    def drain(self) -> list:
+        """Remove e devolve todos os eventos pendentes, em ordem de chegada"""
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+def is_final_event(event: dict) -> bool:
+    """Evento que encerra a pesquisa: marcado como final pelo backend (ou pelo consumidor) ou fim do stream"""
+    return event.get('type') == 'disconnected' or bool(event.get('data', {}).get('final'))
+
+class SSEManager:
+    """
+    Loop asyncio único, em uma thread daemon, que atende os streams SSE de todas as pesquisas
+    do processo com um cliente httpx compartilhado (sem uma thread bloqueada por stream)
+    """
     
-    if event_type == 'search' and 'query' in details:
-        message = f"🔍 {message}"
-    elif event_type == 'plan' and 'query' in details:
-        message = f"📋 {message}"
-    elif event_type == 'analyze':
-        message = f"🔬 {message}"
-        if 'titles' in details:
-            titles = details['titles']
-            if titles:
-                message += f"\n   📄 Analisando: {', '.join(titles[:2])}..."
-    elif event_type == 'report':
-        message = f"📝 {message}"
-        if 'total_results' in details:
-            message += f" ({details['total_results']} resultados)"
-    elif event_type == 'complete':
-        message = f"✅ {message}"
-    elif event_type == 'error':
-        message = f"❌ {message}"
-    elif event_type == 'timeout':
-        message = f"⏱️ {message}"
-    elif event_type == 'cancelled':
-        message = f"🛑 {message}"
-    elif event_type == 'start':
-        message = f"🚀 {message}"
-    elif event_type == 'decision':
-        message = f"🤔 {message}"
-    elif event_type == 'check_result':
-        message = f"🔄 {message}"
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.client = httpx.AsyncClient(timeout=httpx.Timeout(SSE_TIMEOUT))
+        self.thread = Thread(target=self.loop.run_forever, name="sse-manager", daemon=True)
+        self.thread.start()
     
-    return message
+    def subscribe(self, research_id: str, event_queue: 'EventBuffer') -> Future:
+        """Agenda o consumo do stream da pesquisa no loop, entregando os eventos na fila"""
+        return asyncio.run_coroutine_threadsafe(
+            sse_consumer(self.client, research_id, event_queue), self.loop
+        )
+    
+    def cancel(self, research_id: str) -> Future:
+        """Envia o cancelamento da pesquisa pelo loop, sem bloquear o rerun do Streamlit"""
+        return asyncio.run_coroutine_threadsafe(
+            cancel_research(self.client, research_id), self.loop
+        )
 
-def sse_consumer(research_id: str, event_queue: queue.Queue):
-    """Consome eventos SSE em thread separada"""
+@st.cache_resource
+def get_sse_manager() -> SSEManager:
+    """SSEManager do processo, criado uma única vez e reaproveitado entre reruns e sessões"""
+    return SSEManager()
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Sessão HTTP do processo para as chamadas REST ao backend, reaproveitando conexões entre reruns"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=Retry(total=0),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+async def cancel_research(client: httpx.AsyncClient, research_id: str):
+    """Pede ao backend o cancelamento da pesquisa"""
+    try:
+        await client.delete(f"http://localhost:8000/research/{research_id}", timeout=3)
+    except httpx.HTTPError as e:
+        print(f"Erro ao cancelar pesquisa {research_id}: {e}")
+
+async def sse_consumer(client: httpx.AsyncClient, research_id: str, event_queue: 'EventBuffer'):
+    """Consome eventos SSE no loop do SSEManager"""
     try:
         url = f"http://localhost:8000/research/stream/{research_id}"
         headers = {
@@ -244,67 +360,77 @@ def sse_consumer(research_id: str, event_queue: queue.Queue):
             'Cache-Control': 'no-cache',
         }
         
-        response = requests.get(url, stream=True, headers=headers, timeout=1800)
-        
-        if response.status_code != 200:
-            event_queue.put({
-                'type': 'error',
-                'data': {
-                    'message': f'Erro ao conectar SSE: Status {response.status_code}',
-                    'timestamp': datetime.now().isoformat()
-                }
-            })
-            return
-        
-        event_data = ""
-        event_type = None
-        
-        for line in response.iter_lines(decode_unicode=True):
-            if line:
-                if line.startswith('event:'):
-                    event_type = line.split(':', 1)[1].strip()
-                elif line.startswith('data:'):
-                    event_data = line.split(':', 1)[1].strip()
-                elif line.startswith(':'):
-                    # Heartbeat, continua
-                    continue
-                else:
-                    continue
-            else:
-                if event_type and event_data:
+        async with client.stream("GET", url, headers=headers) as response:
+            if response.status_code != 200:
+                event_queue.put({
+                    'type': 'error',
+                    'data': {
+                        'message': f'Erro ao conectar SSE: Status {response.status_code}',
+                        'timestamp': datetime.now().isoformat(),
+                        'final': True
+                    }
+                })
+                return
+            
+            buffer = bytearray()
+            finished = False
+            
+            async for chunk in response.aiter_bytes():
+                buffer += chunk
+                consumed = 0
+                
+                for match in SSE_FRAME_RE.finditer(buffer):
+                    consumed = match.end()
+                    event_type, event_data = match.groups()
+                    if event_type is None:
+                        # Heartbeat, continua
+                        continue
+                    
                     try:
-                        data = json.loads(event_data)
-                        
-                        # Adiciona evento à fila - não modifica st.session_state aqui
-                        event_queue.put({
-                            'type': event_type,
-                            'data': data
-                        })
-                        
-                        # Se é um evento de finalização
-                        if event_type in ['disconnected', 'complete', 'error', 'timeout', 'cancelled']:
-                            # Adicione uma solicitação para verificar o resultado
-                            event_queue.put({
-                                'type': 'check_result',
-                                'data': {
-                                    'message': 'Verificando resultado final',
-                                    'timestamp': datetime.now().isoformat()
-                                }
-                            })
-                            break
+                        data = json_loads(event_data)
                     except json.JSONDecodeError as e:
                         print(f"Erro ao decodificar JSON: {e}")
-                        print(f"Dados recebidos: {event_data}")
+                        print(f"Dados recebidos: {event_data.decode('utf-8', 'replace')}")
+                        continue
                     
-                    event_data = ""
-                    event_type = None
+                    # Lotes do backend trazem vários eventos, que seguem para a fila individualmente
+                    if event_type == b'batch':
+                        events = data.get('events', [])
+                    else:
+                        events = [{'type': event_type.decode('ascii'), 'data': data}]
+                    
+                    # Adiciona eventos à fila - não modifica st.session_state aqui
+                    event_queue.extend(events)
+                    
+                    # O evento final do backend já traz o resultado: o stream termina aqui
+                    if any(is_final_event(event) for event in events):
+                        finished = True
+                        break
+                
+                # Descarta os quadros já lidos; um quadro incompleto fica para o próximo bloco
+                del buffer[:consumed]
+                if finished:
+                    break
+            
+            # Stream encerrado sem evento final: encerra a pesquisa na interface em vez de
+            # esperar o timeout local
+            if not finished:
+                event_queue.put({
+                    'type': 'error',
+                    'data': {
+                        'message': 'Stream SSE encerrado sem resultado final',
+                        'timestamp': datetime.now().isoformat(),
+                        'final': True
+                    }
+                })
                     
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         event_queue.put({
             'type': 'timeout',
             'data': {
                 'message': 'Timeout na conexão SSE',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now().isoformat(),
+                'final': True
             }
         })
     except Exception as e:
@@ -312,166 +438,99 @@ def sse_consumer(research_id: str, event_queue: queue.Queue):
             'type': 'error',
             'data': {
                 'message': f'Erro na conexão SSE: {str(e)}',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now().isoformat(),
+                'final': True
             }
         })
 
-def verify_research_status():
-    """Verifica o status atual da pesquisa no backend"""
-    if not st.session_state.research_id:
-        return False
-        
-    try:
-        response = requests.get(
-            f"http://localhost:8000/research/{st.session_state.research_id}",
-            timeout=5
-        )
-        
-        if response.status_code == 200:
-            result_data = response.json()
-            status = result_data.get("status", "unknown")
-            
-            # Atualiza status e resultado se necessário
-            st.session_state.research_status = status
-            
-            if status in ["completed", "timeout", "failed", "cancelled"]:
-                st.session_state.is_researching = False
-                
-                if "result" in result_data and result_data["result"]:
-                    st.session_state.final_report = result_data["result"]
-                    return True
-            
-            return status in ["completed", "timeout", "failed", "cancelled"]
-        else:
-            return False
-    except Exception as e:
-        print(f"Erro ao verificar status: {str(e)}")
-        return False
+# Avanço da barra de progresso por tipo de evento, limitado a 90% até a conclusão
+PROGRESS_STEPS = {
+    'plan': 10,
+    'search': 5,
+    'analyze': 10
+}
 
 def process_event_queue():
     """Processa eventos da fila"""
-    try:
-        # Processa eventos da fila
-        events_processed = False
-        while not st.session_state.event_queue.empty():
-            events_processed = True
-            event = st.session_state.event_queue.get_nowait()
-            st.session_state.real_time_events.append(event)
-            
-            event_type = event.get('type', '')
-            data = event.get('data', {})
-            
-            # Processa eventos específicos
-            if event_type == 'start':
-                st.session_state.research_progress = 10
-                st.session_state.research_status = "running"
-                
-                # Iniciar temporizador quando a pesquisa começa
-                if not st.session_state.research_start_time:
-                    st.session_state.research_start_time = time.time()
-            elif event_type == 'plan':
-                current_progress = st.session_state.research_progress
-                st.session_state.research_progress = min(current_progress + 10, 90)
-            elif event_type == 'search':
-                current_progress = st.session_state.research_progress
-                st.session_state.research_progress = min(current_progress + 5, 90)
-            elif event_type == 'analyze':
-                current_progress = st.session_state.research_progress
-                st.session_state.research_progress = min(current_progress + 10, 90)
-            elif event_type == 'report':
-                st.session_state.research_progress = 90
-            elif event_type == 'complete':
-                st.session_state.research_progress = 100
-                st.session_state.is_researching = False
-                st.session_state.research_status = "completed"
-                st.session_state.research_start_time = None  # Reset do temporizador
-                
-                # Verifica se recebemos o relatório final
-                if 'result' in data:
-                    st.session_state.final_report = data.get('result', '')
-                else:
-                    # Se não tiver o resultado no evento, faça uma solicitação explícita
-                    verify_research_status()
-            elif event_type in ['error', 'timeout', 'cancelled', 'disconnected']:
-                st.session_state.is_researching = False
-                st.session_state.research_status = event_type if event_type != 'disconnected' else "completed"
-                st.session_state.research_start_time = None  # Reset do temporizador
-                
-                # Verifica se recebemos algum resultado parcial
-                if 'result' in data and data['result']:
-                    st.session_state.final_report = data['result']
-                else:
-                    # Se não tiver o resultado no evento, faça uma solicitação explícita
-                    verify_research_status()
-            elif event_type == 'check_result':
-                # Evento explícito para verificar o resultado
-                if not st.session_state.final_report:
-                    verify_research_status()
-            
-            # Atualiza mensagem de status
-            status_message = format_status_message(event)
-            if status_message:
-                st.session_state.current_task = status_message
-                st.session_state.last_status_update = status_message
+    # Esvazia a fila de uma vez; o lote é processado em variáveis locais e o
+    # session_state recebe uma única escrita por campo no final
+    events = st.session_state.event_queue.drain()
+    if not events:
+        return
+    
+    state = st.session_state
+    progress = state.research_progress
+    report_chunks = []
+    shown_events = []
+    
+    for event in events:
+        event_type = event.get('type', '')
+        data = event.get('data', {})
         
-        # Se processou eventos e a pesquisa está concluída, verifique o resultado final
-        if events_processed and not st.session_state.is_researching and not st.session_state.final_report:
-            verify_research_status()
-            
-    except queue.Empty:
-        pass
-
-def check_for_results():
-    """Verifica se há resultados disponíveis no backend"""
-    if not st.session_state.research_id:
-        return False
+        # Trechos do relatório em streaming: acumulados, sem entrar na lista de eventos
+        if event_type == 'report_chunk':
+            report_chunks.append(data.get('message', ''))
+            continue
         
-    try:
-        response = requests.get(
-            f"http://localhost:8000/research/{st.session_state.research_id}",
-            timeout=3
-        )
-        if response.status_code == 200:
-            result_data = response.json()
-            status = result_data.get("status", "")
-            
-            # Atualiza status
-            if status:
-                st.session_state.research_status = status
-            
-            # Se pesquisa concluída e temos resultado
-            if status in ["completed", "timeout", "failed", "cancelled"] and "result" in result_data:
-                if result_data["result"]:
-                    st.session_state.final_report = result_data["result"]
-                    st.session_state.is_researching = False
-                    return True
+        # Linhas do painel montadas uma única vez, na chegada; a cada atualização só são reescritas
+        event['_display'] = render_event_lines(event)
+        shown_events.append(event)
+        
+        # Processa eventos específicos
+        if event_type == 'start':
+            progress = 10
+            state.research_status = "running"
             
-            # Se pesquisa concluída, marque is_researching como falso
-            if status in ["completed", "timeout", "failed", "cancelled"]:
-                st.session_state.is_researching = False
-                return True
+            # Iniciar temporizador quando a pesquisa começa
+            if not state.research_start_time:
+                state.research_start_time = time.time()
+        elif event_type in PROGRESS_STEPS:
+            progress = min(progress + PROGRESS_STEPS[event_type], 90)
+        elif event_type == 'report':
+            progress = 90
+        
+        # Evento final: traz o resultado (completo ou parcial), sem consulta ao backend.
+        # "complete" e "error" do próprio agente não são finais e só atualizam o status
+        if is_final_event(event):
+            state.is_researching = False
+            state.research_start_time = None  # Reset do temporizador
+            if event_type == 'complete':
+                progress = 100
+                state.research_status = "completed"
+            else:
+                state.research_status = event_type if event_type != 'disconnected' else "completed"
             
-            return False
-    except:
-        return False
-
-def check_backend_status():
-    """Verifica se o backend está funcionando (com cache)"""
-    current_time = time.time()
+            if data.get('result'):
+                state.final_report = data['result']
+                # Bytes e nome do arquivo de download gerados uma vez, na chegada do relatório
+                state.final_report_download = (
+                    data['result'].encode('utf-8'),
+                    f"research_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+                )
     
-    if 'backend_check_time' in st.session_state and 'backend_status' in st.session_state:
-        if current_time - st.session_state.backend_check_time < 30:
-            return st.session_state.backend_status
+    if report_chunks:
+        state.partial_report += "".join(report_chunks)
+    
+    if not shown_events:
+        return
+    
+    state.research_progress = progress
+    
+    # Mais recente primeiro: extendleft inverte o lote, e a renderização percorre na ordem
+    state.real_time_events.extendleft(shown_events)
+    
+    # Só a mensagem do último evento do lote chega a ser exibida
+    status_message = format_status_message(shown_events[-1])
+    if status_message:
+        state.current_task = status_message
 
+@st.cache_data(ttl=BACKEND_CHECK_TTL, show_spinner=False)
+def check_backend_status() -> bool:
+    """Verifica se o backend está funcionando (resultado em cache para todas as sessões)"""
     try:
-        response = requests.get("http://localhost:8000/health", timeout=3)
-        status = response.status_code == 200
-        st.session_state.backend_check_time = current_time
-        st.session_state.backend_status = status
-        return status
-    except:
-        st.session_state.backend_check_time = current_time
-        st.session_state.backend_status = False
+        response = get_http_session().get("http://localhost:8000/health", timeout=3)
+        return response.status_code == 200
+    except Exception:
         return False
 
 def start_research(query: str, max_iterations: int, llm_provider: str, 
@@ -489,7 +548,7 @@ def start_research(query: str, max_iterations: int, llm_provider: str,
         if model_name:
             request_data["model_name"] = model_name
         
-        response = requests.post(
+        response = get_http_session().post(
             "http://localhost:8000/research", 
             json=request_data,
             timeout=10
@@ -500,13 +559,10 @@ def start_research(query: str, max_iterations: int, llm_provider: str,
             research_id = result.get("research_id")
             
             st.session_state.research_id = research_id
-            st.session_state.event_queue = queue.Queue()
-            st.session_state.sse_thread = Thread(
-                target=sse_consumer, 
-                args=(research_id, st.session_state.event_queue)
+            st.session_state.event_queue = EventBuffer()
+            st.session_state.sse_future = get_sse_manager().subscribe(
+                research_id, st.session_state.event_queue
             )
-            st.session_state.sse_thread.daemon = True
-            st.session_state.sse_thread.start()
             
             # Iniciar temporizador para a pesquisa
             st.session_state.research_start_time = time.time()
@@ -521,20 +577,84 @@ def start_research(query: str, max_iterations: int, llm_provider: str,
         st.error(f"Erro ao conectar com backend: {str(e)}")
         return False
 
+# HTML do badge de cada status da pesquisa
+STATUS_BADGES = {
+    'running': '<div class="status-badge status-running pulse">⚙️ EM ANDAMENTO</div>',
+    'completed': '<div class="status-badge status-complete">✅ CONCLUÍDO</div>',
+    'timeout': '<div class="status-badge status-warning">⏱️ TIMEOUT</div>',
+    'failed': '<div class="status-badge status-error">❌ ERRO</div>',
+    'error': '<div class="status-badge status-error">❌ ERRO</div>',
+    'cancelled': '<div class="status-badge status-warning">🛑 CANCELADO</div>'
+}
+
 def render_status_badge():
     """Renderiza badge de status da pesquisa"""
-    status = st.session_state.research_status
+    badge = STATUS_BADGES.get(st.session_state.research_status)
+    if badge:
+        st.markdown(badge, unsafe_allow_html=True)
+
+def render_progress_panel():
+    """Painel de progresso: processa os eventos recebidos e exibe o andamento da pesquisa"""
+    was_researching = st.session_state.is_researching
+    
+    st.header("📊 Progresso da Pesquisa")
+    
+    # Processa eventos da fila
+    process_event_queue()
+    
+    # Exibe badge de status
+    render_status_badge()
     
-    if status == "running":
-        st.markdown('<div class="status-badge status-running pulse">⚙️ EM ANDAMENTO</div>', unsafe_allow_html=True)
-    elif status == "completed":
-        st.markdown('<div class="status-badge status-complete">✅ CONCLUÍDO</div>', unsafe_allow_html=True)
-    elif status == "timeout":
-        st.markdown('<div class="status-badge status-warning">⏱️ TIMEOUT</div>', unsafe_allow_html=True)
-    elif status in ["failed", "error"]:
-        st.markdown('<div class="status-badge status-error">❌ ERRO</div>', unsafe_allow_html=True)
-    elif status == "cancelled":
-        st.markdown('<div class="status-badge status-warning">🛑 CANCELADO</div>', unsafe_allow_html=True)
+    # Exibe progresso e eventos
+    if st.session_state.is_researching or st.session_state.real_time_events:
+        
+        status_label = st.session_state.current_task if st.session_state.current_task else "🔄 Aguardando atualizações..."
+        status_state = "running" if st.session_state.is_researching else "complete"
+        
+        with st.status(status_label, state=status_state, expanded=False) as status:
+            if not st.session_state.real_time_events:
+                status.write("⏳ Aguardando os primeiros eventos...")
+            else:
+                # Um único elemento com todas as linhas: o Streamlit não preserva elementos entre
+                # reexecuções, então enviar o histórico em bloco evita um elemento por linha a cada tick
+                status.markdown("\n\n".join(
+                    line
+                    for event in islice(st.session_state.real_time_events, MAX_EVENTS_SHOWN)
+                    for line in event['_display']
+                ))
+    else:
+        st.info("Inicie uma nova pesquisa para visualizar o progresso em tempo real.")
+
+    if st.session_state.final_report:
+        st.success("✅ Relatório final disponível!")
+    
+    # Timeout local da pesquisa; conclusão e resultado chegam pelo evento final do SSE
+    if st.session_state.is_researching and st.session_state.research_start_time:
+        elapsed_time = time.time() - st.session_state.research_start_time
+        if elapsed_time > st.session_state.max_research_time:
+            st.session_state.is_researching = False
+            st.session_state.research_status = "timeout"
+    
+    # Fim da pesquisa: a página inteira é reexecutada para exibir o relatório e os botões
+    if was_researching and not st.session_state.is_researching:
+        st.rerun()
+
+def render_partial_report():
+    """Exibe o relatório enquanto é gerado"""
+    if st.session_state.partial_report and not st.session_state.final_report:
+        st.header("📝 Relatório em Geração")
+        with st.container():
+            st.markdown(st.session_state.partial_report)
+
+@st.fragment
+def render_copy_report(report: str):
+    """Botão de cópia do relatório; o clique reexecuta só este trecho, não a página com o relatório"""
+    if st.button("📋 Copiar Relatório"):
+        st.text_area(
+            "Texto do Relatório:",
+            value=report,
+            height=200
+        )
 
 def main():
     initialize_session_state()
@@ -635,12 +755,12 @@ def main():
                 type="primary",
                 use_container_width=True
             ):
-                st.session_state.real_time_events = []
+                st.session_state.real_time_events.clear()
                 st.session_state.final_report = ""
+                st.session_state.partial_report = ""
                 st.session_state.is_researching = True
                 st.session_state.research_progress = 0
                 st.session_state.current_task = "Iniciando pesquisa..."
-                st.session_state.last_status_update = ""
                 st.session_state.research_status = "not_started"
                 
                 if start_research(query, max_iterations, llm_provider, api_key, model_name):
@@ -651,8 +771,9 @@ def main():
                 "🗑️ Limpar",
                 use_container_width=True
             ):
-                st.session_state.real_time_events = []
+                st.session_state.real_time_events.clear()
                 st.session_state.final_report = ""
+                st.session_state.partial_report = ""
                 st.session_state.is_researching = False
                 st.session_state.research_progress = 0
                 st.session_state.current_task = ""
@@ -667,139 +788,21 @@ def main():
                     use_container_width=True
                 ):
                     if st.session_state.research_id:
-                        try:
-                            requests.delete(f"http://localhost:8000/research/{st.session_state.research_id}", timeout=3)
-                        except:
-                            pass
+                        get_sse_manager().cancel(st.session_state.research_id)
                     st.session_state.is_researching = False
                     st.session_state.research_start_time = None
                     st.session_state.research_status = "cancelled"
                     st.rerun()
 
         
-    with colAndamento:
-        st.header("📊 Progresso da Pesquisa")
-        
-        # Processa eventos da fila
-        process_event_queue()
-        
-        # Exibe badge de status
-        render_status_badge()
-        
-        # Exibe progresso e eventos
-        if st.session_state.is_researching or st.session_state.real_time_events:
-            
-            status_label = st.session_state.current_task if st.session_state.current_task else "🔄 Aguardando atualizações..."
-            status_state = "running" if st.session_state.is_researching else "complete"
-            
-            with st.status(status_label, state=status_state, expanded=False) as status:
-                if not st.session_state.real_time_events:
-                    status.write("⏳ Aguardando os primeiros eventos...")
-                
-                for event in reversed(st.session_state.real_time_events):
-                    event_type = event.get('type', '')
-                    data = event.get('data', {})
-                    message = data.get('message', '')
-                    details = data.get('details', {})
-                    
-                    icons = {
-                        'start': '🚀',
-                        'plan': '📋',
-                        'search': '🔍',
-                        'search_complete': '✅',
-                        'analyze': '🔬',
-                        'analyze_complete': '📊',
-                        'report': '📝',
-                        'report_complete': '📄',
-                        'complete': '🎉',
-                        'error': '❌',
-                        'timeout': '⏱️',
-                        'cancelled': '🛑',
-                        'pipeline_start': '⚙️',
-                        'decision': '🤔',
-                        'connected': '🔗',
-                        'disconnected': '🔌',
-                        'check_result': '🔄'
-                    }
-                    
-                    icon = icons.get(event_type, '📌')
-                    
-                    if event_type == 'search' and 'query' in details:
-                        status.write(f"{icon} **Buscando:** {details['query']}")
-                    elif event_type == 'plan' and 'query' in details:
-                        status.write(f"{icon} **Nova query planejada:** {details['query']}")
-                    elif event_type == 'analyze' and 'titles' in details:
-                        status.write(f"{icon} **Analisando resultados**")
-                        if details['titles']:
-                            for title in details['titles'][:2]:
-                                status.write(f"   📄 {title}")
-                    elif event_type == 'search_complete':
-                        count = details.get('count', 0)
-                        status.write(f"{icon} **Busca concluída**")
-                    elif event_type == 'analyze_complete':
-                        iteration = details.get('iteration', 0)
-                        status.write(f"{icon} **Análise concluída** - Iteração {iteration}")
-                    elif event_type == 'report':
-                        total = details.get('total_results', 0)
-                        if total > 0:
-                            status.write(f"{icon} **Gerando relatório final** ({total} resultados processados)")
-                        status.write(f"{icon} **Gerando relatório final**")
-                    elif event_type == 'complete':
-                        status.write(f"{icon} **Pesquisa concluída com sucesso!**")
-                    elif event_type == 'error':
-                        status.write(f"{icon} **Erro:** {message}")
-                    elif event_type == 'timeout':
-                        status.write(f"{icon} **Timeout:** {message}")
-                    elif event_type == 'cancelled':
-                        status.write(f"{icon} **Cancelado:** {message}")
-                    elif event_type == 'decision':
-                        status.write(f"{icon} {message}")
-                    elif event_type == 'check_result':
-                        status.write(f"{icon} **Verificando resultado final**")
-                    else:
-                        status.write(f"{icon} {message}")
-                    
-                    if event_type == 'analyze_complete' and 'insights_preview' in details:
-                        status.write(f"💡 **Preview:** {details['insights_preview'][:150]}...")
-                    
-                    elif event_type == 'report_complete' and 'word_count' in details:
-                        word_count = details.get('word_count', 0)
-                        status.write(f"📊 Relatório gerado com {word_count} palavras")
-        else:
-            st.info("Inicie uma nova pesquisa para visualizar o progresso em tempo real.")
-
-        if st.session_state.final_report:
-            st.success("✅ Relatório final disponível!")
+    # Enquanto a pesquisa roda, só o painel de progresso e o relatório parcial são
+    # reexecutados, em intervalos fixos; o restante da página fica como está
+    run_every = REFRESH_INTERVAL if st.session_state.is_researching else None
     
-    # VERIFICAÇÃO PERIÓDICA - Atualizado para ser mais robusto
-    if st.session_state.is_researching:
-        current_time = time.time()
-        # Verifica a cada 3 segundos
-        if current_time - st.session_state.last_check_time > 3:
-            st.session_state.last_check_time = current_time
-            
-            # Verificar se há resultados e atualizar o estado se necessário
-            if check_for_results():
-                st.rerun()
-            
-            # Verificar timeout da pesquisa
-            if st.session_state.research_start_time:
-                elapsed_time = current_time - st.session_state.research_start_time
-                if elapsed_time > st.session_state.max_research_time:
-                    st.session_state.is_researching = False
-                    st.session_state.research_status = "timeout"
-                    # Tentar buscar resultado parcial
-                    verify_research_status()
-                    st.rerun()
+    with colAndamento:
+        st.fragment(render_progress_panel, run_every=run_every)()
     
-    # VERIFICAÇÃO ADICIONAL - Para garantir que eventos de conclusão sejam capturados
-    elif st.session_state.research_id and not st.session_state.final_report:
-        current_time = time.time()
-        # Verifica a cada 5 segundos se a pesquisa já concluiu mas não temos o relatório
-        if current_time - st.session_state.last_check_time > 5:
-            st.session_state.last_check_time = current_time
-            if verify_research_status():
-                st.rerun()
+    st.fragment(render_partial_report, run_every=run_every)()
     
     # Exibe o relatório final se disponível
     if st.session_state.final_report:
@@ -812,33 +815,25 @@ def main():
         col1, col2, col3 = st.columns(3)
         
         with col1:
+            report_bytes, report_file_name = st.session_state.final_report_download
             st.download_button(
                 label="📥 Baixar Relatório (Markdown)",
-                data=st.session_state.final_report,
-                file_name=f"research_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
+                data=report_bytes,
+                file_name=report_file_name,
                 mime="text/markdown"
             )
         
         with col2:
-            if st.button("📋 Copiar Relatório"):
-                st.text_area(
-                    "Texto do Relatório:",
-                    value=st.session_state.final_report,
-                    height=200
-                )
+            render_copy_report(st.session_state.final_report)
         
         with col3:
             if st.button("🔄 Nova Pesquisa"):
                 st.session_state.final_report = ""
-                st.session_state.real_time_events = []
+                st.session_state.partial_report = ""
+                st.session_state.real_time_events.clear()
                 st.session_state.research_status = "not_started"
                 st.rerun()
     
-    # Reexecuta enquanto estiver pesquisando
-    if st.session_state.is_researching:
-        time.sleep(0.5)
-        st.rerun()
-    
     st.markdown("---")
     st.markdown("""
     <div style='text-align: center; color: #666; padding: 20px;'>